@@ -0,0 +1,226 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+import open3d as o3d
+import torch
+from main import (AMASS_Motion, ArrowMeshBuilder, JointAngleData, JointAngleManager, MotionCatalog, MotionKinematics,
+                  PoseExtractor, PoseCache, TensorMesh, UserArrowSetting, VertexNormalEstimator, joints, motion_names)
+
+def calculate_joint_angle_vel_acc_loop(joint_positions, frame_rate):
+    """
+    Reference implementation of the joint angle computation as a loop over frames and joints.
+    """
+    num_frames = joint_positions.shape[0]
+    joint_angle_data = JointAngleData(num_frames)
+    for i in range(0, num_frames):
+        vectors = [0] * 24
+        for joint in joints:
+            if (joint.parent_index != None):
+                parent_position = joint_positions[i][joint.parent_index]
+                current_position = joint_positions[i][joint.index]
+                vectors[joint.index] = JointAngleManager.calcuate_vector_pointed_from_parent(current_position, parent_position)
+
+        for joint in joints:
+            if (joint.child_index != None) :
+                joint_angle = round(JointAngleManager.find_joint_angle(vectors[joint.index], vectors[joint.child_index]))
+                joint_angle_data.angles[joint.index, i] = joint_angle - joint.referecne_angle
+                if (i > 0):
+                    joint_angle_data.velocities[joint.index, i-1] = joint_angle_data.angles[joint.index, i] - joint_angle_data.angles[joint.index, i-1]
+                    joint_angle_data.velocities[joint.index, i-1] /= (1 / frame_rate)
+                if (i > 1):
+                    joint_angle_data.accelertions[joint.index, i-1] = joint_angle_data.velocities[joint.index, i-1] - joint_angle_data.velocities[joint.index, i-2]
+                    joint_angle_data.accelertions[joint.index, i-1] /= (1 / frame_rate)
+    joint_angle_data.isEmpty = False
+    return joint_angle_data
+
+def load_joint_positions(motion, model_folder):
+    pose_extractor = PoseExtractor(model_folder)
+    pose_cache = PoseCache('./cache/poses/')
+    cache_key = pose_cache.key(motion.path, pose_extractor)
+    cached_poses = pose_cache.load(cache_key)
+    if (cached_poses is None):
+        cached_poses = pose_cache.store(cache_key, *pose_extractor.extract(motion.dataset))
+    return np.asarray(cached_poses[0])
+
+def synthetic_joint_positions(num_frames, seed=0):
+    """
+    Random walk of 24 joints, used when no SMPL-X model is available.
+    """
+    rng = np.random.default_rng(seed)
+    steps = rng.normal(scale=0.01, size=(num_frames, 24, 3))
+    return (rng.normal(size=(1, 24, 3)) + np.cumsum(steps, axis=0)).astype(np.float32)
+
+def benchmark_joint_angles(joint_positions, frame_rate, repeat):
+    def best_time(function):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = function(joint_positions, frame_rate)
+            times.append(time.perf_counter() - start)
+        return min(times), result
+
+    loop_time, expected = best_time(calculate_joint_angle_vel_acc_loop)
+    vectorized_time, actual = best_time(JointAngleManager.calculate_joint_angle_data)
+    is_identical = (np.array_equal(expected.angles, actual.angles)
+                    and np.array_equal(expected.velocities, actual.velocities)
+                    and np.array_equal(expected.accelertions, actual.accelertions))
+    print(f"frames: {joint_positions.shape[0]}")
+    print(f"loop:       {loop_time * 1000:10.2f} ms")
+    print(f"vectorized: {vectorized_time * 1000:10.2f} ms ({loop_time / vectorized_time:.1f}x)")
+    print(f"identical:  {is_identical}")
+
+def time_stage(function, num_frames, repeat, trace_memory=False):
+    """
+    Runs a stage 'repeat' times and reports its best time as frames per second.
+
+    With trace_memory, the stage is run once more under tracemalloc to record the peak of
+    memory allocated by Python and NumPy, which the timed runs do not pay for.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    stage = {'seconds': min(times), 'fps': num_frames / min(times)}
+    if (trace_memory):
+        tracemalloc.start()
+        function()
+        stage['traced_peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return stage, result
+
+def benchmark_clip(path, model_folder, repeat, max_frames_per_draw, trace_memory):
+    """
+    Times every stage between an AMASS clip and the geometry drawn for it, without a window.
+
+    Returns:
+    - A dict with the frame count, the stages and the peak resident memory of this process.
+    """
+    motion = AMASS_Motion(motion_names.get(os.path.basename(path), os.path.basename(path)), path)
+    frame_rate = float(motion.frame_rate)
+    dataset = motion.dataset
+    num_frames = motion.num_frames
+    pose_extractor = PoseExtractor(model_folder)
+    vertex_normal_estimator = VertexNormalEstimator(pose_extractor.model.faces)
+    stages = {}
+
+    stages['extraction'], (joint_positions, vertices) = time_stage(
+        lambda: pose_extractor.extract(dataset), num_frames, repeat)
+    stages['vertex_normals'], normals = time_stage(
+        lambda: vertex_normal_estimator.compute(vertices), num_frames, repeat, trace_memory)
+    stages['joint_angles'], _ = time_stage(
+        lambda: JointAngleManager.calculate_joint_angle_data(joint_positions, frame_rate), num_frames, repeat, trace_memory)
+    stages['velocity_acceleration'], (velocities, accelerations) = time_stage(
+        lambda: (MotionKinematics.velocity_field(joint_positions, frame_rate, 1),
+                 MotionKinematics.acceleration_field(joint_positions, frame_rate, 1)), num_frames, repeat, trace_memory)
+
+    # Per-frame stages run over at most max_frames_per_draw frames
+    draw_frames = range(min(num_frames - 1, max_frames_per_draw))
+    arrow_mesh_builder = ArrowMeshBuilder()
+    arrow_setting = UserArrowSetting()
+    scaling_factors = np.linalg.norm(velocities, axis=2) / np.nanmax(np.linalg.norm(velocities, axis=2))
+    def build_arrows():
+        for frame in draw_frames:
+            arrow_mesh_builder.update(*ArrowMeshBuilder.build_transforms(
+                joint_positions[frame], velocities[frame], scaling_factors[frame], arrow_setting))
+    stages['arrow_geometry'], _ = time_stage(build_arrows, len(draw_frames), repeat, trace_memory)
+
+    # Only the copy into the buffers shared with the tensor mesh; uploading to the scene needs a window
+    mesh = TensorMesh(vertices.shape[1], TensorMesh.triangle_tensor(pose_extractor.model.faces))
+    def copy_mesh_buffers():
+        for frame in draw_frames:
+            np.copyto(mesh.vertices, vertices[frame])
+            np.copyto(mesh.normals, normals[frame])
+    stages['mesh_buffer_copy'], _ = time_stage(copy_mesh_buffers, len(draw_frames), repeat)
+
+    # ru_maxrss is in kilobytes on Linux
+    return {'name': motion.name, 'path': path, 'frames': num_frames, 'frame_rate': frame_rate, 'stages': stages,
+            'peak_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024}
+
+def environment_info():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        is_dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                       capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, is_dirty = None, None
+    return {'commit': commit, 'dirty': is_dirty, 'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'platform': platform.platform(), 'processor': platform.processor(), 'cpu_count': os.cpu_count(),
+            'python': platform.python_version(), 'numpy': np.__version__, 'torch': torch.__version__,
+            'open3d': o3d.__version__, 'torch_threads': torch.get_num_threads()}
+
+def run_suite(args):
+    """
+    Benchmarks every clip of the dataset folder in its own process, so that the peak memory
+    of a clip is not hidden by the clips before it, and writes the results to a JSON file.
+    """
+    motions = MotionCatalog(args.dataset_folder).scan().registry(motion_names)
+    results = environment_info()
+    results.update({'repeat': args.repeat, 'max_frames_per_draw': args.max_frames_per_draw, 'clips': []})
+    for motion in motions:
+        command = [sys.executable, os.path.abspath(__file__), 'clip', motion.path, '--model-folder', args.model_folder,
+                   '--repeat', str(args.repeat), '--max-frames-per-draw', str(args.max_frames_per_draw),
+                   '--threads', str(args.threads)]
+        if (args.trace_memory):
+            command.append('--trace-memory')
+        clip_result = json.loads(subprocess.run(command, capture_output=True, text=True, check=True).stdout)
+        results['clips'].append(clip_result)
+        print(f"{clip_result['name']} ({clip_result['frames']} frames, "
+              f"peak {clip_result['peak_rss_bytes'] / 1024**2:.0f} MB)")
+        for name, stage in clip_result['stages'].items():
+            print(f"  {name:24s}{stage['fps']:12.1f} frames/s")
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks of the motion pipeline. Without a command, compares the joint angle loop with the vectorized version.")
+    parser.add_argument('--clip', type=int, default=None,
+                        help="index of the AMASS motion to use; synthetic joints are used if omitted")
+    parser.add_argument('--frames', type=int, default=3000, help="number of synthetic frames")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--model-folder', default='./dataset/models_lockedhead/')
+    parser.add_argument('--dataset-folder', default='./dataset/')
+    subparsers = parser.add_subparsers(dest='command')
+    suite_parser = subparsers.add_parser('suite', help="benchmark every stage on every clip of the dataset folder")
+    suite_parser.add_argument('--output', default='./benchmark_results.json')
+    clip_parser = subparsers.add_parser('clip', help="benchmark one clip and print the results as JSON")
+    clip_parser.add_argument('path')
+    for subparser in (suite_parser, clip_parser):
+        subparser.add_argument('--repeat', type=int, default=3)
+        subparser.add_argument('--model-folder', default='./dataset/models_lockedhead/')
+        subparser.add_argument('--threads', type=int, default=1,
+                               help="torch threads; fixed so results compare between machines")
+        subparser.add_argument('--max-frames-per-draw', type=int, default=1000,
+                               help="number of frames used by the per-frame arrow and mesh stages")
+        subparser.add_argument('--trace-memory', action='store_true',
+                               help="also record the tracemalloc peak of the NumPy stages")
+    args = parser.parse_args()
+
+    if (args.command == 'suite'):
+        run_suite(args)
+        return
+    if (args.command == 'clip'):
+        torch.set_num_threads(args.threads)
+        print(json.dumps(benchmark_clip(args.path, args.model_folder, args.repeat,
+                                        args.max_frames_per_draw, args.trace_memory)))
+        return
+
+    if (args.clip is None):
+        joint_positions = synthetic_joint_positions(args.frames)
+        frame_rate = 120.0
+    else:
+        motion = MotionCatalog(args.dataset_folder).scan().registry(motion_names)[args.clip]
+        joint_positions = load_joint_positions(motion, args.model_folder)
+        frame_rate = float(motion.frame_rate)
+    benchmark_joint_angles(joint_positions, frame_rate, args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -8,10 +8,24 @@ import numpy as np
 import smplx
 import torch
 import math
+import os
+import hashlib
+import shutil
+import tempfile
+import json
+import zipfile
+import fnmatch
+import argparse
+import socket
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from collections import deque, OrderedDict
 from enum import Enum, auto
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from functools import partial
+from functools import partial, wraps
+from contextlib import nullcontext
 
 isMacOS = (platform.system() == "Darwin")
 
@@ -29,17 +43,399 @@ class ArrowType(Enum):
     Velocity = auto()
     Acceleration = auto()
 
+class TensorMesh:
+    """
+    Triangle mesh whose float32 vertex positions and normals are NumPy buffers shared with
+    an o3d.t.geometry.TriangleMesh.
+
+    Writing a frame into 'vertices' and 'normals' updates the geometry handed to the scene,
+    without a conversion to double precision or a further copy.
+    """
+    def __init__(self, num_vertices, triangles):
+        """
+        Args:
+        - num_vertices (int): Number of vertices.
+        - triangles (o3d.core.Tensor): Triangle vertex indices from 'triangle_tensor()'. Meshes may share it.
+        """
+        self.vertices = np.zeros((num_vertices, 3), dtype=np.float32)
+        self.normals = np.zeros((num_vertices, 3), dtype=np.float32)
+        self.geometry = o3d.t.geometry.TriangleMesh()
+        self.geometry.vertex.positions = o3d.core.Tensor.from_numpy(self.vertices)
+        self.geometry.vertex.normals = o3d.core.Tensor.from_numpy(self.normals)
+        self.geometry.triangle.indices = triangles
+
+    @staticmethod
+    def triangle_tensor(faces):
+        return o3d.core.Tensor.from_numpy(np.ascontiguousarray(faces, dtype=np.int32))
+
+class ArrowMeshBuilder:
+    """
+    Builds the arrows of all joints as one merged triangle mesh from a template arrow.
+
+    The template is created once with the dimensions of an arrow of size 1. Every arrow
+    is placed by two 4x4 transforms, one for the cylinder and one for the cone vertices,
+    so the cylinder can be stretched independently of the cone.
+    """
+    cylinder_radius = 0.007
+    cone_radius = 0.015
+    cylinder_height = 0.1
+    cone_height = 0.04
+
+    def __init__(self, num_arrows=24):
+        template = o3d.geometry.TriangleMesh.create_arrow(cylinder_radius=ArrowMeshBuilder.cylinder_radius,
+                                                          cone_radius=ArrowMeshBuilder.cone_radius,
+                                                          cylinder_height=ArrowMeshBuilder.cylinder_height,
+                                                          cone_height=ArrowMeshBuilder.cone_height)
+        template.compute_vertex_normals()
+        self.template_vertices = np.asarray(template.vertices).copy()
+        self.template_normals = np.asarray(template.vertex_normals).copy()
+        template_triangles = np.asarray(template.triangles)
+        # The cylinder spans z in [0, cylinder_height] and the cone starts on top of it
+        is_cone_vertex = self.template_vertices[:, 2] > ArrowMeshBuilder.cylinder_height
+        self.cylinder_vertex_indices = np.flatnonzero(~is_cone_vertex)
+        self.cone_vertex_indices = np.flatnonzero(is_cone_vertex)
+        self.cylinder_template_vertices = self.template_vertices[self.cylinder_vertex_indices]
+        self.cone_template_vertices = self.template_vertices[self.cone_vertex_indices]
+
+        num_vertices = self.template_vertices.shape[0]
+        offsets = np.arange(num_arrows).reshape(-1, 1, 1) * num_vertices
+        self.mesh = TensorMesh(num_arrows * num_vertices,
+                               TensorMesh.triangle_tensor((template_triangles + offsets).reshape(-1, 3)))
+        # Per-arrow views of the mesh buffers
+        self.vertices = self.mesh.vertices.reshape(num_arrows, num_vertices, 3)
+        self.normals = self.mesh.normals.reshape(num_arrows, num_vertices, 3)
+
+    @staticmethod
+    def build_transforms(mesh_joints, vectors, scaling_factor, arrow_setting):
+        """
+        Computes the cylinder and cone transforms of all arrows in one pass.
+
+        Each transform rotates the template's z-axis onto the vector direction, scales the
+        arrow and translates it to its joint. Arrows of zero or NaN vectors get all-zero
+        transforms.
+
+        Args:
+        - mesh_joints (array): (N, 3) joint positions where the arrows start.
+        - vectors (array): (N, 3) vectors giving the directions of the arrows.
+        - scaling_factor (array): (N,) scaling values applied if magnitude scaling is enabled.
+        - arrow_setting (UserArrowSetting): User-defined arrow size and scaling settings.
+
+        Returns:
+        - cylinder_transforms, cone_transforms: (N, 4, 4) transforms.
+        """
+        vectors = np.asarray(vectors, dtype=np.float64)
+        num_arrows = vectors.shape[0]
+        is_visible = ~(np.all(vectors == 0, axis=1) | np.isnan(vectors).any(axis=1))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        directions = np.divide(vectors, norms, out=np.zeros_like(vectors), where=is_visible[:, np.newaxis])
+
+        # Quaternion (w, x, y, z) of the shortest rotation from the z-axis to each direction
+        quaternions = np.empty((num_arrows, 4))
+        quaternions[:, 0] = 1 + directions[:, 2]
+        quaternions[:, 1] = -directions[:, 1]
+        quaternions[:, 2] = directions[:, 0]
+        quaternions[:, 3] = 0
+        # Directions antiparallel to the z-axis: half turn around the x-axis
+        is_antiparallel = quaternions[:, 0] < 1e-8
+        quaternions[is_antiparallel] = [0, 1, 0, 0]
+        quaternions /= np.linalg.norm(quaternions, axis=1, keepdims=True)
+        w, x, y, z = quaternions.T
+        rotations = np.empty((num_arrows, 3, 3))
+        rotations[:, 0, 0] = 1 - 2 * (y * y + z * z)
+        rotations[:, 0, 1] = 2 * (x * y - z * w)
+        rotations[:, 0, 2] = 2 * (x * z + y * w)
+        rotations[:, 1, 0] = 2 * (x * y + z * w)
+        rotations[:, 1, 1] = 1 - 2 * (x * x + z * z)
+        rotations[:, 1, 2] = 2 * (y * z - x * w)
+        rotations[:, 2, 0] = 2 * (x * z - y * w)
+        rotations[:, 2, 1] = 2 * (y * z + x * w)
+        rotations[:, 2, 2] = 1 - 2 * (x * x + y * y)
+
+        height_scailing = np.full(num_arrows, float(arrow_setting.arrow_size))
+        if arrow_setting.is_scailing_enabled:
+            height_scailing = height_scailing * np.nan_to_num(np.broadcast_to(scaling_factor, num_arrows))
+        scailing = np.minimum(1.5, height_scailing) # if scailing > 1.5, only the length of the arrows gets scaled
+
+        # The cylinder is stretched to its height, the cone sits on top of it
+        cylinder_transforms = np.zeros((num_arrows, 4, 4))
+        cylinder_transforms[:, :3, :3] = rotations * np.stack([scailing, scailing, height_scailing], axis=1)[:, np.newaxis, :]
+        cylinder_transforms[:, :3, 3] = mesh_joints
+        cylinder_transforms[:, 3, 3] = 1
+        cone_transforms = np.zeros((num_arrows, 4, 4))
+        cone_transforms[:, :3, :3] = rotations * scailing[:, np.newaxis, np.newaxis]
+        cone_offsets = ArrowMeshBuilder.cylinder_height * (height_scailing - scailing)
+        cone_transforms[:, :3, 3] = mesh_joints + rotations[:, :, 2] * cone_offsets[:, np.newaxis]
+        cone_transforms[:, 3, 3] = 1
+        cylinder_transforms[~is_visible] = 0
+        cone_transforms[~is_visible] = 0
+        return cylinder_transforms, cone_transforms
+
+    def update(self, cylinder_transforms, cone_transforms):
+        """
+        Places every arrow of the merged mesh.
+
+        Args:
+        - cylinder_transforms (array): (num_arrows, 4, 4) transforms applied to the cylinder vertices.
+        - cone_transforms (array): (num_arrows, 4, 4) transforms applied to the cone vertices.
+          Arrows with all-zero transforms collapse to a point and are not visible.
+        """
+        self.vertices[:, self.cylinder_vertex_indices] = (np.einsum('aij,vj->avi', cylinder_transforms[:, :3, :3], self.cylinder_template_vertices)
+                                                          + cylinder_transforms[:, np.newaxis, :3, 3])
+        self.vertices[:, self.cone_vertex_indices] = (np.einsum('aij,vj->avi', cone_transforms[:, :3, :3], self.cone_template_vertices)
+                                                      + cone_transforms[:, np.newaxis, :3, 3])
+        # Normals only follow the rotation. Both transforms share it, and normalizing the columns
+        # of the cylinder's linear part removes its non-uniform (s, s, h) scaling again.
+        linear_parts = cylinder_transforms[:, :3, :3]
+        column_norms = np.linalg.norm(linear_parts, axis=1, keepdims=True)
+        rotations = np.divide(linear_parts, column_norms, out=np.zeros_like(linear_parts), where=column_norms != 0)
+        self.normals[:] = np.einsum('aij,vj->avi', rotations, self.template_normals)
+
 class Arrow:
     def __init__(self, arrow_type, string_id, is_checked):
         self.arrow_type = arrow_type
         self.string_id = string_id
         self.is_checked = is_checked
         self.material = o3d.visualization.rendering.MaterialRecord()
+        self.mesh_builder = ArrowMeshBuilder()
         
 class Pose:
-    def __init__(self, joints, vertices):
+    def __init__(self, joints, vertices, normals=None):
         self.joints = joints
         self.vertices = vertices
+        self.normals = normals
+
+class VertexNormalEstimator:
+    """
+    Computes area-weighted vertex normals of many frames of a mesh with fixed topology.
+
+    The normals are the same as the ones of 'TriangleMesh.compute_vertex_normals()'. The
+    triangle corners are sorted by vertex once, so that summing the normals of the
+    triangles around each vertex is a single 'np.add.reduceat' per chunk of frames.
+    """
+    def __init__(self, faces, chunk_size=16):
+        self.faces = np.asarray(faces, dtype=np.int64)
+        self.chunk_size = chunk_size
+        corner_vertices = self.faces.ravel()
+        corner_order = np.argsort(corner_vertices, kind='stable')
+        self.corner_faces = corner_order // 3
+        self.vertex_indices, self.vertex_boundaries = np.unique(corner_vertices[corner_order], return_index=True)
+
+    def compute(self, vertices, out=None):
+        """
+        Args:
+        - vertices (array): (num_frames, V, 3) vertices.
+        - out (array): Optional (num_frames, V, 3) array the normals are written to.
+
+        Returns:
+        - array: (num_frames, V, 3) unit vertex normals.
+        """
+        if (out is None):
+            out = np.zeros(vertices.shape, dtype=np.float32)
+        for start in range(0, vertices.shape[0], self.chunk_size):
+            chunk = np.asarray(vertices[start:start + self.chunk_size], dtype=np.float32)
+            corners = chunk[:, self.faces[:, 0]]
+            edges1 = chunk[:, self.faces[:, 1]] - corners
+            edges2 = chunk[:, self.faces[:, 2]] - corners
+            face_normals = np.empty_like(edges1)
+            face_normals[..., 0] = edges1[..., 1] * edges2[..., 2] - edges1[..., 2] * edges2[..., 1]
+            face_normals[..., 1] = edges1[..., 2] * edges2[..., 0] - edges1[..., 0] * edges2[..., 2]
+            face_normals[..., 2] = edges1[..., 0] * edges2[..., 1] - edges1[..., 1] * edges2[..., 0]
+            vertex_normals = np.zeros(chunk.shape, dtype=np.float32)
+            vertex_normals[:, self.vertex_indices] = np.add.reduceat(
+                face_normals[:, self.corner_faces], self.vertex_boundaries, axis=1)
+            norms = np.linalg.norm(vertex_normals, axis=2, keepdims=True)
+            np.divide(vertex_normals, norms, out=vertex_normals, where=norms != 0)
+            out[start:start + chunk.shape[0]] = vertex_normals
+        return out
+
+class MeshLevelOfDetail:
+    """
+    A decimated version of a mesh with fixed topology, used while playback cannot keep up.
+
+    The rest mesh is simplified once and every decimated vertex is mapped to the nearest
+    vertex of the full mesh, so a decimated frame is a gather from the full vertex buffer.
+    """
+    def __init__(self, rest_vertices, faces, target_triangles=4000):
+        """
+        Args:
+        - rest_vertices (array): (V, 3) vertices of the mesh in its rest pose.
+        - faces (array): (F, 3) triangle vertex indices.
+        - target_triangles (int): Number of triangles of the decimated mesh.
+        """
+        rest_mesh = o3d.geometry.TriangleMesh(o3d.utility.Vector3dVector(rest_vertices),
+                                              o3d.utility.Vector3iVector(faces))
+        decimated_mesh = rest_mesh.simplify_quadric_decimation(target_triangles)
+        kd_tree = o3d.geometry.KDTreeFlann(o3d.geometry.PointCloud(rest_mesh.vertices))
+        nearest_indices = np.array([kd_tree.search_knn_vector_3d(vertex, 1)[1][0]
+                                    for vertex in np.asarray(decimated_mesh.vertices)], dtype=np.int64)
+        # Decimated vertices that map to the same full vertex are merged, and the triangles they collapse dropped
+        self.vertex_indices, inverse = np.unique(nearest_indices, return_inverse=True)
+        decimated_faces = inverse.reshape(-1)[np.asarray(decimated_mesh.triangles)]
+        is_degenerate = ((decimated_faces[:, 0] == decimated_faces[:, 1]) | (decimated_faces[:, 1] == decimated_faces[:, 2])
+                         | (decimated_faces[:, 0] == decimated_faces[:, 2]))
+        self.faces = np.ascontiguousarray(decimated_faces[~is_degenerate], dtype=np.int32)
+
+    @property
+    def num_vertices(self):
+        return len(self.vertex_indices)
+
+    def gather(self, values, out=None):
+        """
+        Returns the per-vertex values (e.g. positions or normals) of the decimated mesh, written to out if given.
+        """
+        return np.take(values, self.vertex_indices, axis=0, out=out)
+
+class MotionBuffer:
+    """
+    Contiguous float32 storage of the joints and vertices of every frame of a clip.
+
+    joints has shape (num_frames, 24, 3) and vertices (num_frames, V, 3). Indexing the
+    buffer with a frame returns a Pose whose arrays are views into this storage.
+    Vertex normals are stored alongside the vertices once 'compute_normals()' ran.
+
+    A buffer may be filled progressively: only the frames below ready_frames are valid.
+    """
+    def __init__(self, joints, vertices):
+        self.joints = np.ascontiguousarray(joints, dtype=np.float32)
+        self.vertices = np.ascontiguousarray(vertices, dtype=np.float32)
+        self.normals = None
+        self.ready_frames = self.joints.shape[0]
+
+    @staticmethod
+    def allocate(num_frames, num_vertices):
+        """
+        Creates an empty buffer with normals, to be filled by a PoseExtractionWorker.
+        """
+        poses = MotionBuffer(np.zeros((num_frames, 24, 3), dtype=np.float32),
+                             np.zeros((num_frames, num_vertices, 3), dtype=np.float32))
+        poses.normals = np.zeros((num_frames, num_vertices, 3), dtype=np.float32)
+        poses.ready_frames = 0
+        return poses
+
+    @property
+    def is_complete(self):
+        return self.ready_frames == self.num_frames
+
+    @staticmethod
+    def load(motion, pose_extractor, pose_cache, vertex_normal_estimator=None):
+        """
+        Loads the poses of a clip from the pose cache, extracting and caching them on a miss.
+
+        Args:
+        - motion (AMASS_Motion): The clip.
+        - pose_extractor (PoseExtractor): Extractor used on a cache miss.
+        - pose_cache (PoseCache): The pose cache.
+        - vertex_normal_estimator (VertexNormalEstimator): If given, vertex normals are loaded or computed too.
+
+        Returns:
+        - poses (MotionBuffer), cache_key (str)
+        """
+        cache_key = pose_cache.key(motion.path, pose_extractor)
+        cached_poses = pose_cache.load(cache_key)
+        if (cached_poses is None):
+            cached_poses = pose_cache.store(cache_key, *pose_extractor.extract(motion.dataset))
+        poses = MotionBuffer(*cached_poses)
+        if (vertex_normal_estimator is not None):
+            poses.normals = pose_cache.load_array(cache_key, 'normals')
+            if (poses.normals is None):
+                poses.normals = pose_cache.store_array(
+                    cache_key, 'normals', poses.compute_normals(vertex_normal_estimator))
+        return poses, cache_key
+
+    @staticmethod
+    def open(motion, pose_extractor, pose_cache):
+        """
+        Loads the poses and normals of a clip from the pose cache without extracting anything.
+
+        On a cache miss an empty buffer is allocated, and if only the normals are missing
+        the buffer holds the cached poses with no ready frames. Either way the buffer is
+        then filled by a PoseExtractionWorker.
+
+        Args:
+        - motion (AMASS_Motion): The clip.
+        - pose_extractor (PoseExtractor): Extractor whose settings key the pose cache.
+        - pose_cache (PoseCache): The pose cache.
+
+        Returns:
+        - poses (MotionBuffer), cache_key (str), needs_poses (bool): Whether the poses have to be extracted.
+        """
+        cache_key = pose_cache.key(motion.path, pose_extractor)
+        cached_poses = pose_cache.load(cache_key)
+        if (cached_poses is None):
+            return MotionBuffer.allocate(motion.num_frames, pose_extractor.num_vertices), cache_key, True
+        poses = MotionBuffer(*cached_poses)
+        poses.normals = pose_cache.load_array(cache_key, 'normals')
+        if (poses.normals is None):
+            poses.normals = np.zeros(poses.vertices.shape, dtype=np.float32)
+            poses.ready_frames = 0
+        return poses, cache_key, False
+
+    def compute_normals(self, vertex_normal_estimator):
+        self.normals = vertex_normal_estimator.compute(self.vertices)
+        return self.normals
+
+    @property
+    def num_frames(self):
+        return self.joints.shape[0]
+
+    def __len__(self):
+        return self.num_frames
+
+    def __getitem__(self, frame):
+        normals = self.normals[frame] if self.normals is not None else None
+        return Pose(self.joints[frame], self.vertices[frame], normals)
+
+class PoseExtractionWorker:
+    """
+    Fills a MotionBuffer in chunks of frames on a background thread.
+
+    Poses are extracted unless the buffer was loaded from the pose cache, and vertex
+    normals are computed for every chunk. 'ready_frames' of the buffer is advanced after
+    each chunk and on_progress is called from the worker thread. The results are written
+    to the pose cache before the last chunk is reported. Cancelling stops the worker
+    after the current chunk. The chunk size should match the batch size of the pose
+    extractor, since every chunk is padded to a full batch. Skinning and vertex normals
+    are timed per chunk on the given profiler.
+    """
+    def __init__(self, pose_extractor, vertex_normal_estimator, pose_cache, cache_key,
+                 dataset, poses, needs_poses, on_progress, chunk_size=64, profiler=None):
+        self.pose_extractor = pose_extractor
+        self.vertex_normal_estimator = vertex_normal_estimator
+        self.pose_cache = pose_cache
+        self.cache_key = cache_key
+        self.dataset = dataset
+        self.poses = poses
+        self.needs_poses = needs_poses
+        self.on_progress = on_progress
+        self.chunk_size = chunk_size
+        self.profiler = profiler or Profiler()
+        self.cancel_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        poses = self.poses
+        for start in range(poses.ready_frames, poses.num_frames, self.chunk_size):
+            if (self.cancel_event.is_set()):
+                return
+            end = min(poses.num_frames, start + self.chunk_size)
+            if (self.needs_poses):
+                with self.profiler.timer('skinning'):
+                    poses.joints[start:end], poses.vertices[start:end] = self.pose_extractor.extract(self.dataset, start, end)
+            with self.profiler.timer('vertex_normals'):
+                self.vertex_normal_estimator.compute(poses.vertices[start:end], out=poses.normals[start:end])
+            if (end == poses.num_frames):
+                # The cache entry exists before the buffer is reported complete, so stats can be stored with it
+                if (self.needs_poses):
+                    self.pose_cache.store(self.cache_key, poses.joints, poses.vertices)
+                self.pose_cache.store_array(self.cache_key, 'normals', poses.normals)
+            poses.ready_frames = end
+            self.on_progress(poses)
 
 class Joint:
     def __init__(self, name, index, parent_index, child_index, referecne_angle, color):
@@ -78,6 +474,191 @@ joints = [
     Joint("Right Hand", 23, 21, None, None, None)
 ]
 
+class NormalizationSetting:
+    """
+    How the maximum velocity and acceleration used to scale arrows are derived from a clip.
+    """
+    def __init__(self, name, percentile=None, is_per_joint=False, window_size=1):
+        self.name = name
+        self.percentile = percentile
+        self.is_per_joint = is_per_joint
+        self.window_size = window_size
+
+    def key(self):
+        return f"window{self.window_size}_percentile{self.percentile}_perjoint{self.is_per_joint}"
+
+normalization_settings = [
+    NormalizationSetting("Clip maximum"),
+    NormalizationSetting("Clip 99th percentile", percentile=99),
+    NormalizationSetting("Per-joint maximum", is_per_joint=True)
+]
+
+class Profiler:
+    """
+    Named timers that keep the most recent durations of each stage to report p50, p95 and max.
+
+    Disabled profilers return a shared no-op timer and 'profiled' methods skip timing,
+    so instrumented code costs next to nothing unless profiling is turned on. Timers may
+    be recorded from worker threads while the UI thread reads the stats.
+    """
+    history_size = 600
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.durations = {}
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def timer(self, name):
+        """
+        Returns a context manager that records the duration of its block under name.
+        """
+        if (not self.enabled):
+            return Profiler.null_timer
+        return ProfilerTimer(self, name)
+
+    def record(self, name, duration):
+        with self.lock:
+            if (name not in self.durations):
+                self.durations[name] = deque(maxlen=Profiler.history_size)
+                self.counts[name] = 0
+            self.durations[name].append(duration)
+            self.counts[name] += 1
+
+    def reset(self):
+        with self.lock:
+            self.durations.clear()
+            self.counts.clear()
+
+    def stats(self):
+        """
+        Returns:
+        - A dict with the call count and the p50, p95 and max duration in milliseconds of each timer.
+        """
+        with self.lock:
+            snapshot = {name: (list(durations), self.counts[name]) for name, durations in self.durations.items()}
+        stats = {}
+        for name, (durations, count) in snapshot.items():
+            p50, p95 = np.percentile(durations, [50, 95]) * 1000
+            stats[name] = {'count': count, 'p50_ms': round(p50, 3), 'p95_ms': round(p95, 3),
+                           'max_ms': round(max(durations) * 1000, 3)}
+        return stats
+
+    def report(self):
+        return "\n".join(f"{name}: {stat['p50_ms']:.2f} / {stat['p95_ms']:.2f} / {stat['max_ms']:.2f} ms"
+                         for name, stat in sorted(self.stats().items()))
+
+    def dump(self, path, extra=None):
+        """
+        Writes the timer stats, and optional extra values, to a JSON file for comparing runs.
+        """
+        with open(path, 'w') as f:
+            json.dump({'time': time.strftime('%Y-%m-%d %H:%M:%S'), 'timers': self.stats(), **(extra or {})}, f, indent=2)
+
+class ProfilerTimer:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.record(self.name, time.perf_counter() - self.start_time)
+
+Profiler.null_timer = nullcontext()
+
+def profiled(name):
+    """
+    Decorates a method of an object with a 'profiler' attribute to time its calls under name.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if (not self.profiler.enabled):
+                return method(self, *args, **kwargs)
+            start_time = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self.profiler.record(name, time.perf_counter() - start_time)
+        return wrapper
+    return decorator
+
+class PlaybackScheduler:
+    """
+    Maps wall-clock time to the frame that should be shown during playback.
+
+    Playback follows the clip's frame rate times the playback speed. When rendering
+    falls behind, frames that are already past due are skipped instead of slowing
+    playback down. The rate of rendered frames is tracked to compare it with the target.
+    """
+    def __init__(self, speed=1.0):
+        self.speed = speed
+        self.frame_rate = 1.0
+        self.direction = 1
+        self.start_frame = 0
+        self.start_time = None
+        self.last_frame = None
+        self.dropped_frames = 0
+        self.render_times = deque(maxlen=30)
+
+    @property
+    def target_fps(self):
+        return self.frame_rate * self.speed
+
+    @property
+    def achieved_fps(self):
+        if (len(self.render_times) < 2 or self.render_times[-1] == self.render_times[0]):
+            return 0.0
+        return (len(self.render_times) - 1) / (self.render_times[-1] - self.render_times[0])
+
+    def start(self, frame, direction, frame_rate):
+        """
+        Starts the playback clock at a frame.
+
+        Args:
+        - frame (int): Frame shown when the clock starts.
+        - direction (int): 1 to play forward, -1 to play in reverse.
+        - frame_rate (float): Frame rate of the clip.
+        """
+        self.frame_rate = float(frame_rate)
+        self.direction = direction
+        self.start_frame = frame
+        self.start_time = time.perf_counter()
+        self.last_frame = None
+        self.dropped_frames = 0
+        self.render_times.clear()
+
+    def set_speed(self, speed):
+        if (self.start_time is not None):
+            self.start_frame = self.target_frame()
+            self.start_time = time.perf_counter()
+        self.speed = speed
+
+    def target_frame(self):
+        """
+        Returns the frame that is due now.
+        """
+        elapsed_frames = math.floor((time.perf_counter() - self.start_time) * self.target_fps)
+        return self.start_frame + self.direction * elapsed_frames
+
+    def time_to_next_frame(self):
+        elapsed_frames = (time.perf_counter() - self.start_time) * self.target_fps
+        return (math.floor(elapsed_frames) + 1 - elapsed_frames) / self.target_fps
+
+    def frame_rendered(self, frame):
+        if (self.last_frame is not None):
+            self.dropped_frames += max(0, abs(frame - self.last_frame) - 1)
+        self.last_frame = frame
+        self.render_times.append(time.perf_counter())
+
+    def report(self):
+        return f"{self.achieved_fps:.1f} / {self.target_fps:.1f} FPS, {self.dropped_frames} dropped"
+
+playback_speeds = [0.25, 0.5, 1.0, 1.5, 2.0]
+
 class UserArrowSetting:
     def __init__(self):
         self.is_enabled = False
@@ -101,57 +682,1391 @@ class JointAngleManager:
             dot_product = np.clip(dot_product, -1.0, 1.0)
             angle_rad = np.arccos(dot_product)
             return np.degrees(angle_rad)
+
+    @staticmethod
+    def calculate_joint_angle_data(joint_positions, frame_rate):
+        """
+        Computes joint angles, angular velocities and angular accelerations for all frames at once.
+
+        The result is identical to applying 'calcuate_vector_pointed_from_parent' and
+        'find_joint_angle' joint by joint and frame by frame.
+
+        Args:
+        - joint_positions (array): (num_frames, 24, 3) joint positions.
+        - frame_rate (float): Frame rate of the motion.
+
+        Returns:
+        - JointAngleData: Angles, velocities and accelerations of the joints that have a child.
+        """
+        joint_positions = np.asarray(joint_positions, dtype=np.float32)
+        frame_rate = float(frame_rate)
+        num_frames = joint_positions.shape[0]
+        joint_angle_data = JointAngleData(num_frames)
+
+        # Unit vectors pointing from each joint's parent to the joint
+        bone_indices = np.array([joint.index for joint in joints if joint.parent_index != None])
+        bone_parent_indices = np.array([joint.parent_index for joint in joints if joint.parent_index != None])
+        vectors = np.zeros_like(joint_positions)
+        bones = joint_positions[:, bone_indices] - joint_positions[:, bone_parent_indices]
+        norms = np.linalg.norm(bones, axis=2, keepdims=True)
+        vectors[:, bone_indices] = np.divide(bones, norms, out=bones, where=norms != 0)
+
+        # Joint angle
+        angle_joints = [joint for joint in joints if joint.child_index != None]
+        angle_indices = np.array([joint.index for joint in angle_joints])
+        child_indices = np.array([joint.child_index for joint in angle_joints])
+        reference_angles = np.array([joint.referecne_angle for joint in angle_joints], dtype=np.float32)
+        dot_products = np.einsum('fjk,fjk->jf', vectors[:, angle_indices], vectors[:, child_indices])
+        dot_products = np.clip(dot_products, -1.0, 1.0)
+        angles = np.round(np.degrees(np.arccos(dot_products))) - reference_angles[:, np.newaxis]
+        joint_angle_data.angles[angle_indices] = angles
+
+        # Joint angular velocity and acceleration
+        velocities = np.diff(angles, axis=1) / (1 / frame_rate)
+        joint_angle_data.velocities[angle_indices, :num_frames-1] = velocities
+        joint_angle_data.accelertions[angle_indices, 1:num_frames-1] = np.diff(velocities, axis=1) / (1 / frame_rate)
+        joint_angle_data.isEmpty = False
+        return joint_angle_data
     
 class JointAngleData:
     def __init__(self, num_frames):
-        self.angles = np.zeros((22, num_frames))
-        self.velocities = np.zeros((22, num_frames))
-        self.accelertions = np.zeros((22, num_frames))
+        self.angles = np.zeros((22, num_frames), dtype=np.float32)
+        self.velocities = np.zeros((22, num_frames), dtype=np.float32)
+        self.accelertions = np.zeros((22, num_frames), dtype=np.float32)
         self.isEmpty = True
 
+class PlotDecimator:
+    """
+    Reduces long series to a bounded number of points for plotting.
+
+    Each series is split into equally sized buckets and the minimum and maximum of every
+    bucket are kept, in frame order, so that peaks survive the decimation.
+    """
+    max_points = 2000
+
+    @staticmethod
+    def min_max_indices(series, max_points=None):
+        """
+        Args:
+        - series (array): Series shaped (num_series, num_frames).
+        - max_points (int): Maximum number of points kept per series.
+
+        Returns:
+        - Frame indices of the kept points, shaped (num_series, num_points).
+        """
+        max_points = max_points or PlotDecimator.max_points
+        num_series, num_frames = series.shape
+        if (num_series == 0):
+            return np.empty((0, 0), dtype=int)
+        if (num_frames <= max_points):
+            return np.broadcast_to(np.arange(num_frames), (num_series, num_frames))
+        bucket_size = math.ceil(num_frames / (max_points // 2))
+        num_buckets = math.ceil(num_frames / bucket_size)
+        # Pad the last bucket with the last value, whose index is clipped back below
+        padded = np.pad(series, ((0, 0), (0, num_buckets * bucket_size - num_frames)), mode='edge')
+        buckets = padded.reshape(num_series, num_buckets, bucket_size)
+        bucket_starts = np.arange(num_buckets) * bucket_size
+        indices = np.stack([bucket_starts + np.nanargmin(buckets, axis=2),
+                            bucket_starts + np.nanargmax(buckets, axis=2)], axis=2)
+        indices = np.minimum(np.sort(indices, axis=2), num_frames - 1)
+        return indices.reshape(num_series, -1)
+
+class JointAngleChart:
+    """
+    Scrolling chart of the joint angles, velocities and accelerations around the playhead.
+
+    Image columns form a ring buffer indexed by frame modulo the chart width, so when the
+    playhead moves only the columns of the frames that scrolled into view are drawn.
+    """
+    background_color = [32, 32, 32]
+    axis_color = [90, 90, 90]
+    playhead_color = [255, 255, 255]
+
+    def __init__(self, width=300, panel_height=60):
+        """
+        Args:
+        - width (int): Chart width in pixels, one column per frame.
+        - panel_height (int): Height of each of the angle, velocity and acceleration panels.
+        """
+        self.width = width
+        self.panel_height = panel_height
+        self.ring = np.zeros((3 * panel_height, width, 3), dtype=np.uint8)
+        self.ring[:] = JointAngleChart.background_color
+        self.joint_colors = {joint.index: np.array([int(joint.color[i:i + 2], 16) for i in (1, 3, 5)], dtype=np.uint8)
+                             for joint in joints if joint.color is not None}
+        self.rows = None
+        self.zero_rows = []
+        self.checked_joint_indices = ()
+        self.start_frame = None
+
+    @property
+    def has_data(self):
+        return self.rows is not None
+
+    def set_data(self, joint_angle_data):
+        """
+        Converts the series of a clip to pixel rows, scaling each panel to the range of its series.
+
+        Args:
+        - joint_angle_data (JointAngleData): Data of the clip, or None to clear the chart.
+        """
+        self.invalidate()
+        if (joint_angle_data is None):
+            self.rows = None
+            return
+        series = [joint_angle_data.angles, joint_angle_data.velocities, joint_angle_data.accelertions]
+        self.rows = np.empty((3,) + joint_angle_data.angles.shape, dtype=np.int32)
+        self.zero_rows = []
+        for panel, values in enumerate(series):
+            low, high = np.nanmin(values), np.nanmax(values)
+            scale = (self.panel_height - 1) / (high - low) if high > low else 0
+            panel_bottom = (panel + 1) * self.panel_height - 1
+            self.rows[panel] = panel_bottom - np.round((np.nan_to_num(values, nan=low) - low) * scale)
+            if (low <= 0 <= high):
+                self.zero_rows.append(int(panel_bottom - round(-low * scale)))
+
+    def invalidate(self):
+        """
+        Makes the next 'update()' redraw every column.
+        """
+        self.start_frame = None
+
+    def update(self, frame):
+        """
+        Scrolls the chart to a frame and draws the columns of frames that came into view.
+
+        Args:
+        - frame (int): Index of the current frame, shown in the middle of the chart.
+
+        Returns:
+        - The chart image as a (height, width, 3) uint8 array.
+        """
+        checked_joint_indices = tuple(joint.index for joint in joints[:22]
+                                      if joint.child_index != None and joint.is_checked)
+        if (checked_joint_indices != self.checked_joint_indices):
+            self.checked_joint_indices = checked_joint_indices
+            self.invalidate()
+
+        start_frame = frame - self.width // 2
+        if (self.start_frame is None or abs(start_frame - self.start_frame) >= self.width):
+            new_frames = range(start_frame, start_frame + self.width)
+        elif (start_frame > self.start_frame):
+            new_frames = range(self.start_frame + self.width, start_frame + self.width)
+        else:
+            new_frames = range(start_frame, self.start_frame)
+        for new_frame in new_frames:
+            self.draw_column(new_frame)
+        self.start_frame = start_frame
+
+        offset = start_frame % self.width
+        image = np.concatenate([self.ring[:, offset:], self.ring[:, :offset]], axis=1)
+        image[:, frame - start_frame] = JointAngleChart.playhead_color
+        return image
+
+    def draw_column(self, frame):
+        column = self.ring[:, frame % self.width]
+        column[:] = JointAngleChart.background_color
+        if (self.rows is None or frame < 0 or frame >= self.rows.shape[2]):
+            return
+        column[self.zero_rows] = JointAngleChart.axis_color
+        previous_frame = max(frame - 1, 0)
+        for joint_index in self.checked_joint_indices:
+            for panel_rows in self.rows:
+                row_range = sorted((panel_rows[joint_index, previous_frame], panel_rows[joint_index, frame]))
+                column[row_range[0]:row_range[1] + 1] = self.joint_colors[joint_index]
+
+class PoseExtractor:
+    """
+    Runs AMASS pose parameters through a SMPL-X model in chunks of frames.
+
+    The model is created with a batch size equal to the chunk size, and the last
+    (partial) chunk of a clip is zero-padded up to it, so a single model instance
+    serves every chunk.
+    """
+    joint_indices = np.r_[0:22, 37, 52]
+
+    def __init__(self, model_folder, gender='neutral', num_betas=0, batch_size=256):
+        self.model_folder = model_folder
+        self.gender = gender
+        self.num_betas = num_betas
+        self.batch_size = batch_size
+        self.model = smplx.create(model_folder, model_type='smplx',
+                                  gender=gender, use_face_contour=False,
+                                  num_betas=num_betas,
+                                  num_expression_coeffs=0,
+                                  ext='npz',
+                                  batch_size=batch_size)
+        self.lock = threading.Lock()
+
+    @property
+    def num_vertices(self):
+        return self.model.get_num_verts()
+
+    def extract(self, dataset, start=0, end=None):
+        """
+        Computes joint positions and mesh vertices for the frames [start, end) of a clip.
+
+        Args:
+        - dataset (dict): AMASS pose parameters containing 'root_orient', 'pose_body' and 'trans'.
+        - start (int): Index of the first frame.
+        - end (int): Index after the last frame. Defaults to the number of frames in the dataset.
+
+        Returns:
+        - joints (array): (num_frames, 24, 3) joint positions.
+        - vertices (array): (num_frames, V, 3) mesh vertices.
+        """
+        root_orient = dataset['root_orient']
+        pose_body = dataset['pose_body']
+        trans = dataset['trans']
+        if end is None:
+            end = root_orient.shape[0]
+
+        joints = []
+        vertices = []
+        for chunk_start in range(start, end, self.batch_size):
+            chunk_end = min(end, chunk_start + self.batch_size)
+            num_frames = chunk_end - chunk_start
+            global_orient = np.zeros((self.batch_size, 3), dtype=np.float32)
+            body_pose = np.zeros((self.batch_size, 63), dtype=np.float32)
+            global_orient[:num_frames] = root_orient[chunk_start:chunk_end, :3]
+            body_pose[:num_frames] = pose_body[chunk_start:chunk_end, :63]
+            with self.lock, torch.no_grad():
+                output = self.model(global_orient=torch.from_numpy(global_orient),
+                                    body_pose=torch.from_numpy(body_pose), betas=None)
+            translation = trans[chunk_start:chunk_end, :3].astype(np.float32).reshape(num_frames, 1, 3)
+            joint_positions = output.joints.cpu().numpy()[:num_frames]
+            joints.append(joint_positions[:, self.joint_indices] + translation)
+            vertices.append(output.vertices.cpu().numpy()[:num_frames] + translation)
+
+        return np.concatenate(joints), np.concatenate(vertices)
+
+class PoseCache:
+    """
+    Persistent on-disk cache of the joints and vertices extracted from AMASS clips.
+
+    Each entry is a folder named after a hash of the clip path, the clip file content,
+    the model folder and the body model settings. It holds float32 'joints.npy' and
+    'vertices.npy' files which are memory-mapped when loaded. When the cache grows
+    beyond max_bytes, the least recently used entries are evicted.
+    """
+    version = 1
+
+    def __init__(self, cache_folder, max_bytes=2 * 1024**3):
+        self.cache_folder = cache_folder
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_folder, exist_ok=True)
+
+    @staticmethod
+    def hash_file(path):
+        hasher = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(partial(f.read, 1 << 20), b''):
+                hasher.update(block)
+        return hasher.hexdigest()
+
+    def key(self, path, pose_extractor):
+        """
+        Builds the cache key of a clip for the given pose extractor settings.
+
+        Args:
+        - path (str): Path of the AMASS npz file.
+        - pose_extractor (PoseExtractor): Extractor whose model settings the cached poses depend on.
+        """
+        hasher = hashlib.sha1()
+        for part in (PoseCache.version, os.path.abspath(path), PoseCache.hash_file(path),
+                     os.path.abspath(pose_extractor.model_folder), pose_extractor.gender,
+                     pose_extractor.num_betas):
+            hasher.update(str(part).encode())
+            hasher.update(b'\0')
+        return hasher.hexdigest()
+
+    def load(self, key):
+        """
+        Memory-maps the cached joints and vertices of an entry, or returns None on a miss.
+        """
+        entry_folder = os.path.join(self.cache_folder, key)
+        try:
+            joints = np.load(os.path.join(entry_folder, 'joints.npy'), mmap_mode='r')
+            vertices = np.load(os.path.join(entry_folder, 'vertices.npy'), mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+        os.utime(entry_folder)
+        return joints, vertices
+
+    def load_array(self, key, name):
+        """
+        Memory-maps an additional array stored with an entry, or returns None if there is none.
+        """
+        try:
+            return np.load(os.path.join(self.cache_folder, key, name + '.npy'), mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+
+    def store_array(self, key, name, array):
+        """
+        Stores an additional float32 array with an existing entry and returns it memory-mapped.
+
+        If the entry is missing, or another process evicted it meanwhile, the array is
+        returned as it is.
+        """
+        array = np.ascontiguousarray(array, dtype=np.float32)
+        entry_folder = os.path.join(self.cache_folder, key)
+        if (not os.path.isdir(entry_folder)):
+            return array
+        temp_path = os.path.join(entry_folder, '.' + name + '.npy.tmp')
+        try:
+            with open(temp_path, 'wb') as f:
+                np.save(f, array)
+            os.replace(temp_path, os.path.join(entry_folder, name + '.npy'))
+        except OSError:
+            return array
+        self.evict(keep=key)
+        stored_array = self.load_array(key, name)
+        return array if stored_array is None else stored_array
+
+    def load_stats(self, key):
+        """
+        Returns the statistics stored with an entry, or an empty dict if there are none.
+        """
+        try:
+            with open(os.path.join(self.cache_folder, key, 'stats.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def store_stats(self, key, stats):
+        """
+        Stores a JSON-serializable dict of statistics with an existing entry.
+        """
+        entry_folder = os.path.join(self.cache_folder, key)
+        if (not os.path.isdir(entry_folder)):
+            return
+        temp_path = os.path.join(entry_folder, '.stats.json.tmp')
+        with open(temp_path, 'w') as f:
+            json.dump(stats, f)
+        os.replace(temp_path, os.path.join(entry_folder, 'stats.json'))
+
+    def store(self, key, joints, vertices):
+        """
+        Writes joints and vertices as a new entry, evicts old entries and returns the memory-mapped arrays.
+
+        If another process evicted the entry before it could be loaded again, the arrays
+        are returned as they are.
+        """
+        joints = np.ascontiguousarray(joints, dtype=np.float32)
+        vertices = np.ascontiguousarray(vertices, dtype=np.float32)
+        temp_folder = tempfile.mkdtemp(dir=self.cache_folder, prefix='.tmp_')
+        np.save(os.path.join(temp_folder, 'joints.npy'), joints)
+        np.save(os.path.join(temp_folder, 'vertices.npy'), vertices)
+        entry_folder = os.path.join(self.cache_folder, key)
+        shutil.rmtree(entry_folder, ignore_errors=True)
+        os.replace(temp_folder, entry_folder)
+        self.evict(keep=key)
+        stored_poses = self.load(key)
+        return (joints, vertices) if stored_poses is None else stored_poses
+
+    def evict(self, keep=None):
+        """
+        Removes least recently used entries until the cache fits into max_bytes.
+
+        Args:
+        - keep (str): Key of an entry that must not be evicted.
+        """
+        entries = []
+        total_bytes = 0
+        for name in os.listdir(self.cache_folder):
+            entry_folder = os.path.join(self.cache_folder, name)
+            if name.startswith('.') or not os.path.isdir(entry_folder):
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(entry_folder))
+            entries.append((os.path.getmtime(entry_folder), size, name))
+            total_bytes += size
+        for _, size, name in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            shutil.rmtree(os.path.join(self.cache_folder, name), ignore_errors=True)
+            total_bytes -= size
+
+class MotionKinematics:
+    """
+    Smoothed joint velocity and acceleration vectors for every frame of a clip.
+
+    The smoothing windows match the ones used for the velocity and acceleration arrows.
+    The windowed sums telescope, so each frame only needs the end points of its
+    window and a whole field costs O(num_frames) regardless of the window size.
+    """
+    @staticmethod
+    def window_bounds(num_frames, window_size, extension):
+        frames = np.arange(num_frames)
+        start_indices = np.maximum(0, frames - math.floor(window_size/2))
+        end_indices = np.minimum(num_frames-1, frames + math.ceil(window_size/2) + extension)
+        return start_indices, end_indices
+
+    @staticmethod
+    def velocity_field(joint_positions, frame_rate, window_size):
+        """
+        Computes the smoothed joint velocities of all frames.
+
+        Args:
+        - joint_positions (array): (num_frames, 24, 3) joint positions.
+        - frame_rate (float): Frame rate of the motion.
+        - window_size (int): Size of the smoothing window.
+
+        Returns:
+        - array: (num_frames, 24, 3) velocity vectors.
+        """
+        joint_positions = np.asarray(joint_positions, dtype=np.float32)
+        frame_rate = float(frame_rate)
+        start_indices, end_indices = MotionKinematics.window_bounds(joint_positions.shape[0], window_size, 0)
+        # sum(joints[j+1]) - sum(joints[j]) over the window
+        difference_vectors = (joint_positions[end_indices] - joint_positions[start_indices]) / window_size
+        return difference_vectors / (1 / frame_rate)
+
+    @staticmethod
+    def acceleration_field(joint_positions, frame_rate, window_size):
+        """
+        Computes the smoothed joint accelerations of all frames.
+
+        Frames whose window holds a single velocity get NaN vectors, which are not drawn.
+
+        Args:
+        - joint_positions (array): (num_frames, 24, 3) joint positions.
+        - frame_rate (float): Frame rate of the motion.
+        - window_size (int): Size of the smoothing window.
+
+        Returns:
+        - array: (num_frames, 24, 3) acceleration vectors.
+        """
+        joint_positions = np.asarray(joint_positions, dtype=np.float32)
+        frame_rate = float(frame_rate)
+        start_indices, end_indices = MotionKinematics.window_bounds(joint_positions.shape[0], window_size, 1)
+        velocities = np.diff(joint_positions, axis=0, append=joint_positions[-1:]) / (1 / frame_rate)
+        # sum(velocities[j+1] - velocities[j]) over the window
+        last_indices = np.maximum(start_indices, end_indices - 1)
+        vectors = (velocities[last_indices] - velocities[start_indices]) / (1 / frame_rate)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vectors /= (end_indices - start_indices - 1)[:, np.newaxis, np.newaxis]
+        return vectors
+
+    @staticmethod
+    def magnitude_maxima(joint_positions, frame_rate, normalization_setting):
+        """
+        Derives the velocity and acceleration magnitudes that arrows are scaled against.
+
+        Args:
+        - joint_positions (array): (num_frames, 24, 3) joint positions.
+        - frame_rate (float): Frame rate of the motion.
+        - normalization_setting (NormalizationSetting): Smoothing, percentile and per-joint options.
+
+        Returns:
+        - max_vel, max_acc: Scalars, or (24,) arrays if the setting is per joint.
+        """
+        window_size = normalization_setting.window_size
+        # The last frame is never drawn
+        velocity_magnitudes = np.linalg.norm(
+            MotionKinematics.velocity_field(joint_positions, frame_rate, window_size)[:-1], axis=2)
+        acceleration_magnitudes = np.linalg.norm(
+            MotionKinematics.acceleration_field(joint_positions, frame_rate, window_size)[:-1], axis=2)
+        axis = 0 if normalization_setting.is_per_joint else None
+        maxima = []
+        for magnitudes in (velocity_magnitudes, acceleration_magnitudes):
+            if (normalization_setting.percentile is None):
+                maximum = np.nanmax(magnitudes, axis=axis)
+            else:
+                maximum = np.nanpercentile(magnitudes, normalization_setting.percentile, axis=axis)
+            maxima.append(maximum)
+        return maxima[0], maxima[1]
+
 class AMASS_Motion:
     _counter = 0
+    pose_parameter_keys = ('root_orient', 'pose_body', 'trans')
 
-    def __init__(self, name, max_vel, max_acc, path):
+    def __init__(self, name, path, max_vel=None, max_acc=None, num_frames=None, frame_rate=None):
+        """
+        Args:
+        - name (str): Name shown in the motion dataset list.
+        - path (str): Path of the AMASS npz file.
+        - max_vel, max_acc (float): Optional fixed arrow normalization. Derived from the clip if omitted.
+        - num_frames, frame_rate: Known clip header values. Read from the file if omitted.
+        """
         self.index = AMASS_Motion._counter
         AMASS_Motion._counter += 1
         self.name = name
         self.max_vel = max_vel
         self.max_acc = max_acc
         self.path = path
-        self.dataset = np.load(self.path)
-        self.num_frames = self.dataset['root_orient'].shape[0]
-        self.frame_rate = self.dataset['mocap_frame_rate']
-
-
-AMASS_Motions = [
-    AMASS_Motion('Dance', 5.34, 489.42, './dataset/05_03_stageii.npz'),
-    AMASS_Motion('Walking', 5.7, 222.7, './dataset/02_02_stageii.npz'),
-    AMASS_Motion('Running', 6.5, 165.407, './dataset/02_03_stageii.npz'),
-    AMASS_Motion('Star jump', 4, 144.7, './dataset/Subject_2_F_2_stageii.npz'),
-    AMASS_Motion('Basketball - walking dribble', 6.3, 947, './dataset/06_03_stageii.npz'),
-    AMASS_Motion('Basketball - side hop dribble', 5.2, 374.4, './dataset/06_09_stageii.npz'), 
-    AMASS_Motion('Basketball - jump shoot', 4.3, 365.7, './dataset/06_14_stageii.npz'),
-    AMASS_Motion('Basketball - jump shoot 2',  5.7, 619.2, './dataset/06_15_stageii.npz'),
-    AMASS_Motion('Football', 11.7, 514.6, './dataset/10_05_stageii.npz'),
-    AMASS_Motion('Chicken Wings', 4.8, 295.7, './dataset/50002_chicken_wings_stageii.npz')
-]
+        self._dataset = None
+        if (num_frames is None or frame_rate is None):
+            num_frames, frame_rate, _ = AMASS_Motion.read_header(self.path)
+        self.num_frames = num_frames
+        self.frame_rate = frame_rate
+
+    @staticmethod
+    def read_header(path):
+        """
+        Reads the number of frames, the frame rate and the gender of an AMASS npz file.
+
+        Only the header of 'root_orient' is decompressed, not the array itself.
+
+        Returns:
+        - num_frames (int), frame_rate (array), gender (str or None)
+        """
+        with zipfile.ZipFile(path) as archive:
+            with archive.open('root_orient.npy') as f:
+                version = np.lib.format.read_magic(f)
+                if (version == (1, 0)):
+                    shape, _, _ = np.lib.format.read_array_header_1_0(f)
+                else:
+                    shape, _, _ = np.lib.format.read_array_header_2_0(f)
+            with archive.open('mocap_frame_rate.npy') as f:
+                frame_rate = np.lib.format.read_array(f)
+            gender = None
+            if ('gender.npy' in archive.namelist()):
+                with archive.open('gender.npy') as f:
+                    gender = np.lib.format.read_array(f)
+                gender = gender.item().decode() if gender.dtype.kind == 'S' else str(gender)
+        return shape[0], frame_rate, gender
+
+    @property
+    def dataset(self):
+        """
+        Pose parameters of the clip, read from the npz file on first access.
+        """
+        if (self._dataset is None):
+            with np.load(self.path) as npz:
+                self._dataset = {key: npz[key] for key in AMASS_Motion.pose_parameter_keys}
+        return self._dataset
+
+    def unload(self):
+        """
+        Drops the pose parameters. Users that still hold the dataset keep their reference.
+        """
+        self._dataset = None
+
+class MotionRegistry:
+    """
+    Catalog of AMASS motions which keeps the datasets of at most max_loaded motions in memory.
+
+    Datasets are loaded when a motion is selected, and the least recently selected
+    ones are unloaded.
+    """
+    def __init__(self, motions, max_loaded=2):
+        self.motions = list(motions)
+        self.max_loaded = max_loaded
+        self.loaded_motions = OrderedDict()
+
+    def __len__(self):
+        return len(self.motions)
+
+    def __iter__(self):
+        return iter(self.motions)
+
+    def __getitem__(self, index):
+        return self.motions[index]
+
+    def select(self, index):
+        """
+        Loads the dataset of a motion and unloads the least recently selected ones.
+
+        Args:
+        - index (int): Index of the motion.
+
+        Returns:
+        - AMASS_Motion: The selected motion.
+        """
+        motion = self.motions[index]
+        motion.dataset
+        self.loaded_motions[motion.index] = motion
+        self.loaded_motions.move_to_end(motion.index)
+        while (len(self.loaded_motions) > self.max_loaded):
+            _, evicted_motion = self.loaded_motions.popitem(last=False)
+            evicted_motion.unload()
+        return motion
+
+    def release(self, motion):
+        """
+        Unloads the dataset of a motion that was loaded without being selected, such as a
+        comparison clip. Selected motions stay loaded until the registry evicts them.
+        """
+        if (motion.index not in self.loaded_motions):
+            motion.unload()
+
+
+class MotionMemo:
+    """
+    Least recently used memo of data derived from clips, such as joint angles and velocity fields.
+
+    Entries are evicted, least recently used first, once their total size exceeds max_bytes.
+    """
+    def __init__(self, max_bytes=256 * 1024**2):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.num_bytes = 0
+
+    @staticmethod
+    def size_of(value):
+        if (isinstance(value, JointAngleData)):
+            return value.angles.nbytes + value.velocities.nbytes + value.accelertions.nbytes
+        return getattr(value, 'nbytes', 1024)
+
+    def get(self, key):
+        """
+        Returns the value stored for key, or None.
+        """
+        if (key not in self.entries):
+            return None
+        self.entries.move_to_end(key)
+        return self.entries[key][0]
+
+    def store(self, key, value):
+        """
+        Stores a value and evicts the least recently used entries that exceed the budget.
+
+        Returns:
+        - The value.
+        """
+        self.discard(key)
+        size = MotionMemo.size_of(value)
+        if (size > self.max_bytes):
+            return value
+        self.entries[key] = (value, size)
+        self.num_bytes += size
+        while (self.num_bytes > self.max_bytes):
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.num_bytes -= evicted_size
+        return value
+
+    def discard(self, key):
+        if (key in self.entries):
+            _, size = self.entries.pop(key)
+            self.num_bytes -= size
+
+class MotionCatalog:
+    """
+    Index of the AMASS clips found below a dataset folder, persisted as a JSON file.
+
+    Each entry records the name, path, frame count, frame rate, duration and gender of a
+    clip, plus derived statistics once they are known. A scan only reads the headers of
+    files that are new or whose mtime or size changed since the index was written.
+    """
+    def __init__(self, dataset_folder, index_folder='./cache/', pattern='*_stageii.npz'):
+        self.dataset_folder = dataset_folder
+        self.pattern = pattern
+        folder_hash = hashlib.sha1(os.path.abspath(dataset_folder).encode()).hexdigest()[:16]
+        self.index_path = os.path.join(index_folder, f"motion_index_{folder_hash}.json")
+        try:
+            with open(self.index_path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def scan(self):
+        """
+        Updates the index from the files currently in the dataset folder.
+
+        Returns:
+        - MotionCatalog: self, for chaining.
+        """
+        entries = {}
+        for folder, _, file_names in os.walk(self.dataset_folder):
+            for file_name in fnmatch.filter(file_names, self.pattern):
+                path = os.path.join(folder, file_name)
+                relative_path = os.path.relpath(path, self.dataset_folder)
+                stat = os.stat(path)
+                entry = self.entries.get(relative_path)
+                if (entry is None or entry['mtime_ns'] != stat.st_mtime_ns or entry['size'] != stat.st_size):
+                    try:
+                        num_frames, frame_rate, gender = AMASS_Motion.read_header(path)
+                    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+                        continue
+                    entry = {
+                        'name': relative_path[:-len('_stageii.npz')] if relative_path.endswith('_stageii.npz') else relative_path,
+                        'path': os.path.abspath(path),
+                        'mtime_ns': stat.st_mtime_ns,
+                        'size': stat.st_size,
+                        'num_frames': int(num_frames),
+                        'frame_rate': float(frame_rate),
+                        'duration': num_frames / float(frame_rate),
+                        'gender': gender,
+                        'stats': {}
+                    }
+                entries[relative_path] = entry
+        is_changed = entries != self.entries
+        self.entries = entries
+        if (is_changed):
+            self.save()
+        return self
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        temp_path = self.index_path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(self.entries, f)
+        os.replace(temp_path, self.index_path)
+
+    def set_stats(self, path, stats):
+        """
+        Records derived statistics of a clip in the index.
+
+        Args:
+        - path (str): Path of the clip.
+        - stats (dict): JSON-serializable statistics, merged into the existing ones.
+        """
+        relative_path = os.path.relpath(path, self.dataset_folder)
+        if (relative_path in self.entries and any(self.entries[relative_path]['stats'].get(key) != value
+                                                  for key, value in stats.items())):
+            self.entries[relative_path]['stats'].update(stats)
+            self.save()
+
+    def registry(self, names=None, max_loaded=2):
+        """
+        Creates a MotionRegistry of the indexed clips without opening any of them.
+
+        Args:
+        - names (dict): Optional display names keyed by path relative to the dataset folder.
+          Named clips come first, in the order of the dict, followed by the others sorted by name.
+        """
+        names = names or {}
+        named_paths = [path for path in names if path in self.entries]
+        other_paths = sorted((path for path in self.entries if path not in names),
+                             key=lambda path: self.entries[path]['name'])
+        motions = []
+        for relative_path in named_paths + other_paths:
+            entry = self.entries[relative_path]
+            # Entries are shared by every path of the dataset folder, so the clip path is rebuilt from the current one
+            path = os.path.join(self.dataset_folder, relative_path)
+            motions.append(AMASS_Motion(names.get(relative_path, entry['name']), path,
+                                        num_frames=entry['num_frames'], frame_rate=entry['frame_rate']))
+        return MotionRegistry(motions, max_loaded)
+
+class NpzPoseSource:
+    """
+    Reads the pose parameters of an AMASS npz file sequentially, a chunk of frames at a time.
+
+    Every array is read from its own stream of the zip archive, so the clip is never
+    decompressed into memory as a whole.
+    """
+    def __init__(self, path):
+        self.num_frames, frame_rate, _ = AMASS_Motion.read_header(path)
+        self.frame_rate = float(frame_rate)
+        self.frames_read = 0
+        self.archive = zipfile.ZipFile(path)
+        self.streams = {}
+        for key in AMASS_Motion.pose_parameter_keys:
+            f = self.archive.open(f'{key}.npy')
+            version = np.lib.format.read_magic(f)
+            if (version == (1, 0)):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            if (fortran_order):
+                raise ValueError(f"{path}: '{key}' is not stored in C order")
+            self.streams[key] = (f, dtype, shape[1:])
+
+    @property
+    def is_exhausted(self):
+        return self.frames_read == self.num_frames
+
+    def read(self, max_frames):
+        """
+        Returns:
+        - A dict with the 'root_orient', 'pose_body' and 'trans' arrays of the next frames, at most max_frames.
+        """
+        num_frames = min(max_frames, self.num_frames - self.frames_read)
+        chunk = {}
+        for key, (f, dtype, row_shape) in self.streams.items():
+            row_size = dtype.itemsize * int(np.prod(row_shape))
+            chunk[key] = np.frombuffer(f.read(num_frames * row_size), dtype=dtype).reshape((num_frames,) + row_shape)
+        self.frames_read += num_frames
+        return chunk
+
+    def close(self):
+        for f, _, _ in self.streams.values():
+            f.close()
+        self.archive.close()
+
+class MemmapPoseSource:
+    """
+    Reads pose parameters from a folder of memory-mapped 'root_orient.npy', 'pose_body.npy'
+    and 'trans.npy' files, for example an extracted AMASS npz file.
+    """
+    def __init__(self, folder, frame_rate=None):
+        self.arrays = {key: np.load(os.path.join(folder, f'{key}.npy'), mmap_mode='r')
+                       for key in AMASS_Motion.pose_parameter_keys}
+        if (frame_rate is None):
+            frame_rate = np.load(os.path.join(folder, 'mocap_frame_rate.npy'))
+        self.frame_rate = float(frame_rate)
+        self.num_frames = self.arrays['trans'].shape[0]
+        self.frames_read = 0
+
+    @property
+    def is_exhausted(self):
+        return self.frames_read == self.num_frames
+
+    def read(self, max_frames):
+        end = min(self.frames_read + max_frames, self.num_frames)
+        chunk = {key: np.array(array[self.frames_read:end]) for key, array in self.arrays.items()}
+        self.frames_read = end
+        return chunk
+
+    def close(self):
+        self.arrays = {}
+
+class SocketPoseSource:
+    """
+    Receives pose parameters over TCP, as a stand-in for a live mocap feed.
+
+    The sender first writes the frame rate as a float64, followed by 69 little-endian float32
+    per frame: 'root_orient' (3), 'pose_body' (63) and 'trans' (3). See 'serve_pose_stream()'.
+    """
+    frame_size = 69 * 4
+
+    def __init__(self, host, port, timeout=0.05):
+        self.socket = socket.create_connection((host, port))
+        header = b''
+        while (len(header) < 8):
+            data = self.socket.recv(8 - len(header))
+            if (not data):
+                raise ConnectionError(f"{host}:{port} closed before sending a frame rate")
+            header += data
+        self.frame_rate = float(np.frombuffer(header, dtype='<f8')[0])
+        self.num_frames = None
+        self.socket.settimeout(timeout)
+        self.buffer = bytearray()
+        self.is_closed = False
+
+    @staticmethod
+    def pack(chunk):
+        frames = np.concatenate([chunk['root_orient'][:, :3], chunk['pose_body'][:, :63], chunk['trans'][:, :3]], axis=1)
+        return frames.astype('<f4').tobytes()
+
+    @property
+    def is_exhausted(self):
+        return self.is_closed and len(self.buffer) < SocketPoseSource.frame_size
+
+    def read(self, max_frames):
+        """
+        Returns the frames received so far, at most max_frames. Waits up to the timeout if none arrived yet.
+        """
+        if (not self.is_closed and len(self.buffer) < SocketPoseSource.frame_size):
+            try:
+                data = self.socket.recv(65536)
+                self.buffer += data
+                self.is_closed = not data
+            except socket.timeout:
+                pass
+        num_frames = min(max_frames, len(self.buffer) // SocketPoseSource.frame_size)
+        frames = np.frombuffer(bytes(self.buffer[:num_frames * SocketPoseSource.frame_size]), dtype='<f4').reshape(num_frames, 69)
+        del self.buffer[:num_frames * SocketPoseSource.frame_size]
+        return {'root_orient': frames[:, 0:3], 'pose_body': frames[:, 3:66], 'trans': frames[:, 66:69]}
+
+    def close(self):
+        self.socket.close()
+
+def serve_pose_stream(source, host='127.0.0.1', port=9999):
+    """
+    Sends the frames of a pose source to one client at the source frame rate, in the format read by SocketPoseSource.
+    """
+    with socket.create_server((host, port)) as server:
+        connection, _ = server.accept()
+        with connection:
+            connection.sendall(np.float64(source.frame_rate).astype('<f8').tobytes())
+            start_time = time.perf_counter()
+            frames_sent = 0
+            while (not source.is_exhausted):
+                connection.sendall(SocketPoseSource.pack(source.read(1)))
+                frames_sent += 1
+                time.sleep(max(0, start_time + frames_sent / source.frame_rate - time.perf_counter()))
+
+def open_pose_source(path, frame_rate=None):
+    """
+    Opens an npz file, a folder of npy files, or a 'host:port' address as a pose source.
+    """
+    if (os.path.isdir(path)):
+        return MemmapPoseSource(path, frame_rate)
+    if (os.path.isfile(path)):
+        return NpzPoseSource(path)
+    host, _, port = path.rpartition(':')
+    if (not host or not port.isdigit()):
+        raise FileNotFoundError(f"{path} is neither an existing npz file or folder nor a 'host:port' address")
+    return SocketPoseSource(host, int(port))
+
+class MotionStream:
+    """
+    Skins the frames of a pose source on a background thread into a fixed-size ring of frames.
+
+    Frames are numbered from the start of the source and live in slot 'frame % capacity'.
+    The worker skins frames ahead of the playhead until the ring is full, overwriting frames
+    more than 'history' frames behind it, so memory use does not depend on the clip length.
+    Playback can only move forward.
+    """
+    def __init__(self, source, pose_extractor, vertex_normal_estimator, capacity=256, history=32):
+        self.source = source
+        self.pose_extractor = pose_extractor
+        self.vertex_normal_estimator = vertex_normal_estimator
+        self.capacity = capacity
+        self.history = history
+        num_vertices = pose_extractor.num_vertices
+        self.joints = np.zeros((capacity, 24, 3), dtype=np.float32)
+        self.vertices = np.zeros((capacity, num_vertices, 3), dtype=np.float32)
+        self.normals = np.zeros((capacity, num_vertices, 3), dtype=np.float32)
+        self.ready_frames = 0
+        self.playhead = 0
+        self.condition = threading.Condition()
+        self.cancel_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    @property
+    def frame_rate(self):
+        return self.source.frame_rate
+
+    @property
+    def num_frames(self):
+        return self.source.num_frames
+
+    @property
+    def is_complete(self):
+        return False
+
+    @property
+    def first_frame(self):
+        return max(0, self.ready_frames - self.capacity)
+
+    def __getitem__(self, frame):
+        slot = frame % self.capacity
+        return Pose(self.joints[slot], self.vertices[slot], self.normals[slot])
+
+    def joint_window(self, start, end):
+        """
+        Returns the joint positions of the buffered frames in [start, end) and the index of the first one.
+        """
+        start = max(start, self.first_frame)
+        end = min(end, self.ready_frames)
+        return self.joints[np.arange(start, end) % self.capacity], start
+
+    def seek(self, frame):
+        with self.condition:
+            self.playhead = max(self.playhead, frame)
+            self.condition.notify()
+
+    def start(self):
+        self.thread.start()
+
+    def cancel(self):
+        self.cancel_event.set()
+        with self.condition:
+            self.condition.notify()
+
+    def run(self):
+        while (not self.cancel_event.is_set() and not self.source.is_exhausted):
+            with self.condition:
+                # Slots of frames more than 'history' behind the playhead may be overwritten
+                free_slots = self.playhead - self.history + self.capacity - self.ready_frames
+                if (free_slots <= 0):
+                    self.condition.wait(0.05)
+                    continue
+            chunk = self.source.read(min(free_slots, self.pose_extractor.batch_size))
+            num_frames = chunk['trans'].shape[0]
+            if (num_frames == 0):
+                continue
+            joints, vertices = self.pose_extractor.extract(chunk)
+            slots = np.arange(self.ready_frames, self.ready_frames + num_frames) % self.capacity
+            self.joints[slots] = joints
+            self.vertices[slots] = vertices
+            self.normals[slots] = self.vertex_normal_estimator.compute(vertices)
+            with self.condition:
+                self.ready_frames += num_frames
+        self.source.close()
+
+motion_names = {
+    '05_03_stageii.npz': 'Dance',
+    '02_02_stageii.npz': 'Walking',
+    '02_03_stageii.npz': 'Running',
+    'Subject_2_F_2_stageii.npz': 'Star jump',
+    '06_03_stageii.npz': 'Basketball - walking dribble',
+    '06_09_stageii.npz': 'Basketball - side hop dribble',
+    '06_14_stageii.npz': 'Basketball - jump shoot',
+    '06_15_stageii.npz': 'Basketball - jump shoot 2',
+    '10_05_stageii.npz': 'Football',
+    '50002_chicken_wings_stageii.npz': 'Chicken Wings'
+}
+
+class ComparisonClip:
+    """
+    A clip drawn next to the selected one and played in lockstep with it by time.
+
+    Its mesh is built from the shared triangle buffer, so each frame only uploads vertices.
+    Poses missing from the pose cache are filled in by 'extraction_worker', and the clip is
+    drawn once its first frame is ready.
+    """
+    def __init__(self, motion, poses, offset, string_id, triangles):
+        self.motion = motion
+        self.poses = poses
+        self.offset = np.asarray(offset, dtype=np.float32)
+        self.string_id = string_id
+        self.mesh = TensorMesh(poses.vertices.shape[1], triangles)
+        self.extraction_worker = None
+
+    def frame_at(self, seconds):
+        """
+        Returns the frame of this clip shown at a time in seconds, holding the last frame once the clip ended.
+        """
+        return min(int(round(seconds * float(self.motion.frame_rate))), self.poses.ready_frames - 1)
+
+class MotionRenderer:
+    """
+    Draws the body mesh, joints and velocity/acceleration arrows of a clip into an Open3DScene.
+
+    Used by the interactive VisualizationApp and by the offscreen MotionVideoExporter.
+    Subclasses set 'open3d_scene' to the scene they render into.
+    """
+    extraction_batch_size = 256
+
+    def __init__(self, motion_catalog=None, model_folder='./dataset/models_lockedhead/', memo_max_bytes=256 * 1024**2):
+        self.motion_catalog = motion_catalog
+        self.model_folder = model_folder
+        self.motion_memo = MotionMemo(memo_max_bytes)
+        self.profiler = Profiler()
+        self.total_time_point_cloud = 0
+        self.total_time_mesh = 0
+        self.frame_count = 0
+        self.open3d_scene = None
+        self.motion_data = None
+        self.poses = None
+        self.mesh_state = MeshState.Trasparent
+        self.vel_arrow_setting = UserArrowSetting()
+        self.acc_arrow_setting = UserArrowSetting()
+        self.vel_max = 1
+        self.acc_max = 1
+        self.normalization_setting = normalization_settings[0]
+        self.velocity_field = None
+        self.acceleration_field = None
+        self.comparison_clips = []
+        self.comparison_spacing = 1.0
+        self.initialize_open3d()
+
+    def setup_lighting(self):
+        self.open3d_scene.scene.set_sun_light(
+            [0.577, -0.577, -0.577],  # direction
+            [1, 1, 1],  # color
+            45000)  # intensity
+        # self.open3d_scene.scene.enable_sun_light(True)
+        self.open3d_scene.scene.enable_sun_light(False)
+        self.open3d_scene.show_skybox(True)
+        # self.open3d_scene.set_background([0, 0, 0, 1])
+
+    def load_poses(self):
+        """
+        Loads the poses and vertex normals of the current clip, from the pose cache or by extracting them.
+        """
+        self.poses, self.pose_cache_key = MotionBuffer.load(
+            self.motion_data, self.pose_extractor, self.pose_cache, self.vertex_normal_estimator)
+        self.velocity_field = None
+        self.acceleration_field = None
+        self.update_normalization()
+
+    def initialize_open3d(self):
+        self.pose_extractor = PoseExtractor(self.model_folder, batch_size=self.extraction_batch_size)
+        self.model = self.pose_extractor.model
+        self.vertex_normal_estimator = VertexNormalEstimator(self.model.faces)
+        self.pose_cache = PoseCache('./cache/poses/')
+        # Materials
+        self.mat_mesh = o3d.visualization.rendering.MaterialRecord()
+        self.mat_mesh.shader = "defaultLitTransparency"
+        self.mat_mesh.base_roughness = 0.0
+        self.mat_mesh.base_reflectance = 0.0
+        self.mat_mesh.base_clearcoat = 1.0
+        self.mat_mesh.thickness = 1.0
+        self.mat_mesh.transmission = 1.0
+        self.mat_mesh.absorption_distance = 10
+        self.mat_mesh.absorption_color = [0.5, 0.5, 0.5]
+        self.mat_mesh.base_color = [0.467, 0.467, 0.467, 0.2]
+        self.mat_mesh.base_color = [0.3, 0.3, 0.3, 0.5]
+
+        self.mat_dot = o3d.visualization.rendering.MaterialRecord()
+        self.mat_dot.shader = 'defaultLit'
+        self.mat_dot.base_color = [0.8, 0, 0, 1.0]
+        self.mat_dot.point_size = 5
+
+        self.arrow_velocity = Arrow(ArrowType.Velocity, "arrow_vel", False)
+        self.arrow_acceleration = Arrow(ArrowType.Acceleration, "arrow_acc", False)
+
+        self.arrow_velocity.material.shader = 'defaultLit'
+        self.arrow_velocity.material.base_color = [1, 1, 0, 1.0]
+
+        self.arrow_acceleration.material.shader = 'defaultLit'
+        self.arrow_acceleration.material.base_color = [1, 0, 0, 1.0]
+
+        # Mesh and Joints
+        self.mesh_triangles = TensorMesh.triangle_tensor(self.model.faces)
+        self.mesh = TensorMesh(self.pose_extractor.num_vertices, self.mesh_triangles)
+        # The decimated mesh is only built by the viewer, once playback falls behind
+        self.mesh_lod = None
+        self.lod_mesh = None
+        self.use_low_detail = False
+        self.joint_positions = np.zeros((24, 3), dtype=np.float32)
+        self.joints_pcl = o3d.t.geometry.PointCloud(o3d.core.Tensor.from_numpy(self.joint_positions))
+    
+    def remove_vel_arrows(self):
+        self.open3d_scene.remove_geometry(self.arrow_velocity.string_id)
+
+    def remove_acc_arrows(self):
+        self.open3d_scene.remove_geometry(self.arrow_acceleration.string_id)
+
+    def update_normalization(self):
+        """
+        Sets the velocity and acceleration maxima used by "Reflect vector magnitude" for the current clip.
+
+        Maxima are derived from the whole clip and stored with its pose cache entry,
+        unless the motion defines fixed values. Nothing changes until two frames are ready,
+        as velocities need at least two frames.
+        """
+        if (self.poses.ready_frames < 2):
+            return
+        stats = {}
+        if (self.poses.is_complete):
+            stats = self.motion_memo.get(self.memo_key('stats'))
+            if (stats is None):
+                stats = self.motion_memo.store(self.memo_key('stats'), self.pose_cache.load_stats(self.pose_cache_key))
+        stats_key = self.normalization_setting.key()
+        if (stats_key not in stats):
+            # While the clip is still being extracted, maxima are estimated from the ready frames
+            max_vel, max_acc = MotionKinematics.magnitude_maxima(
+                self.poses.joints[:self.poses.ready_frames], self.motion_data.frame_rate, self.normalization_setting)
+            stats[stats_key] = {'max_vel': np.asarray(max_vel).tolist(), 'max_acc': np.asarray(max_acc).tolist()}
+            if (self.poses.is_complete):
+                self.pose_cache.store_stats(self.pose_cache_key, stats)
+                if (self.motion_catalog is not None):
+                    self.motion_catalog.set_stats(self.motion_data.path, stats)
+        self.vel_max = self.motion_data.max_vel if self.motion_data.max_vel is not None else np.asarray(stats[stats_key]['max_vel'])
+        self.acc_max = self.motion_data.max_acc if self.motion_data.max_acc is not None else np.asarray(stats[stats_key]['max_acc'])
+
+    def memo_key(self, *names):
+        return (self.motion_data.path,) + names
+
+    def get_velocity_field(self):
+        """
+        Returns the joint velocities of all ready frames, computing them for the current smoothing size if needed.
+
+        Fields of complete clips are memoized, so they are reused when a clip is selected again.
+        """
+        if (self.velocity_field is None or len(self.velocity_field) != self.poses.ready_frames):
+            key = self.memo_key('velocity_field', self.vel_arrow_setting.smoothing_size)
+            self.velocity_field = self.motion_memo.get(key) if self.poses.is_complete else None
+            if (self.velocity_field is None):
+                self.velocity_field = MotionKinematics.velocity_field(
+                    self.poses.joints[:self.poses.ready_frames], self.motion_data.frame_rate, self.vel_arrow_setting.smoothing_size)
+                if (self.poses.is_complete):
+                    self.motion_memo.store(key, self.velocity_field)
+        return self.velocity_field
+
+    def get_acceleration_field(self):
+        """
+        Returns the joint accelerations of all ready frames, computing them for the current smoothing size if needed.
+
+        Fields of complete clips are memoized, so they are reused when a clip is selected again.
+        """
+        if (self.acceleration_field is None or len(self.acceleration_field) != self.poses.ready_frames):
+            key = self.memo_key('acceleration_field', self.acc_arrow_setting.smoothing_size)
+            self.acceleration_field = self.motion_memo.get(key) if self.poses.is_complete else None
+            if (self.acceleration_field is None):
+                self.acceleration_field = MotionKinematics.acceleration_field(
+                    self.poses.joints[:self.poses.ready_frames], self.motion_data.frame_rate, self.acc_arrow_setting.smoothing_size)
+                if (self.poses.is_complete):
+                    self.motion_memo.store(key, self.acceleration_field)
+        return self.acceleration_field
+
+    @profiled('velocity')
+    def calculate_draw_velocity(self, frame):
+        """
+        Looks up joint velocities for a specified frame based on smoothing settings
+         and passes the velocity vectors to 'draw_arrow()'.
+
+        Args:
+        - frame (int): Index of the current frame.
+        """
+        if (frame >= self.poses.ready_frames - 1):
+            return
+        vectors = self.get_velocity_field()[frame]
+        magnitudes = np.linalg.norm(vectors, axis=1)
+        scaling_factor = magnitudes / self.vel_max
+        self.draw_arraw(self.poses[frame].joints, vectors, scaling_factor, self.arrow_velocity, self.vel_arrow_setting)
+
+    @profiled('acceleration')
+    def calculate_draw_acceleration(self, frame):
+        """
+        Looks up joint accelerations for a specified frame based on smoothing settings
+         and passes the acceleration vectors to 'draw_arrow()'.
+
+        Args:
+        - frame (int): Index of the current frame.
+        """
+        if (frame >= self.poses.ready_frames - 1):
+            return
+        vectors = self.get_acceleration_field()[frame]
+        magnitudes = np.linalg.norm(vectors, axis=1)
+        normalized_magnitudes = magnitudes / self.acc_max
+        self.draw_arraw(self.poses[frame].joints, vectors, normalized_magnitudes, self.arrow_acceleration, self.acc_arrow_setting)
+
+    @profiled('draw_mesh')
+    def draw_mesh(self, frame):
+        """
+        Visualize a human body mesh in a scene for a specified frame.
+
+        Joints and the mesh share float32 buffers with their tensor geometries, so a frame
+        is a single copy with no conversion. Open3D can only update point clouds in place,
+        so the mesh is re-added to the scene. While 'use_low_detail' is set, the decimated
+        mesh is drawn instead.
+
+        Args:
+        - frame (int): Index of the current frame.
+        """
+        if (frame >= self.poses.ready_frames - 1): 
+            return
+        
+        start_time = time.perf_counter()
+        if (self.mesh_state == MeshState.Hidden or self.mesh_state == MeshState.Trasparent):
+            np.copyto(self.joint_positions, self.poses[frame].joints)
+            if (self.open3d_scene.has_geometry('joints')):
+                self.open3d_scene.scene.update_geometry('joints', self.joints_pcl, rendering.Scene.UPDATE_POINTS_FLAG)
+            else:
+                self.open3d_scene.add_geometry('joints', self.joints_pcl, self.mat_dot)
+        else:
+            self.open3d_scene.remove_geometry('joints')
+        mesh_start_time = time.perf_counter()
+        self.total_time_point_cloud += mesh_start_time - start_time
+
+        self.open3d_scene.remove_geometry('mesh')
+        if (self.mesh_state != MeshState.Hidden):
+            pose = self.poses[frame]
+            if (self.use_low_detail):
+                mesh = self.lod_mesh
+                self.mesh_lod.gather(pose.vertices, out=mesh.vertices)
+                self.mesh_lod.gather(pose.normals, out=mesh.normals)
+            else:
+                mesh = self.mesh
+                np.copyto(mesh.vertices, pose.vertices)
+                np.copyto(mesh.normals, pose.normals)
+            if (self.mesh_state == MeshState.Trasparent):
+                self.mat_mesh.shader = 'defaultLitTransparency'
+            elif (self.mesh_state == MeshState.Opaque):
+                self.mat_mesh.shader = 'defaultLit'
+            self.open3d_scene.add_geometry('mesh', mesh.geometry, self.mat_mesh)
+        if (self.comparison_clips):
+            self.draw_comparison_meshes(frame)
+        self.total_time_mesh += time.perf_counter() - mesh_start_time
+
+    def add_comparison_clip(self, motion, on_progress=None):
+        """
+        Adds a clip that is drawn beside the selected one. Its poses are loaded from the pose
+        cache, or extracted with the shared model by a background worker on a cache miss.
+        Comparing the selected clip with itself shares its buffer, and its worker if it is still extracting.
+
+        Args:
+        - motion (AMASS_Motion): The clip.
+        - on_progress (function): Called from the worker thread with the clip after each extracted chunk.
+
+        Returns:
+        - ComparisonClip: The added clip.
+        """
+        if (motion is self.motion_data):
+            poses, cache_key, needs_poses = self.poses, self.pose_cache_key, False
+        else:
+            poses, cache_key, needs_poses = MotionBuffer.open(motion, self.pose_extractor, self.pose_cache)
+        offset = [self.comparison_spacing * (len(self.comparison_clips) + 1), 0, 0]
+        comparison_clip = ComparisonClip(motion, poses, offset, f"comparison_mesh_{len(self.comparison_clips)}",
+                                         self.mesh_triangles)
+        if (not poses.is_complete and poses is not self.poses):
+            def on_extraction_progress(poses):
+                if (on_progress is not None):
+                    on_progress(comparison_clip)
+            comparison_clip.extraction_worker = PoseExtractionWorker(
+                self.pose_extractor, self.vertex_normal_estimator, self.pose_cache, cache_key,
+                motion.dataset, poses, needs_poses, on_extraction_progress,
+                chunk_size=self.pose_extractor.batch_size, profiler=self.profiler)
+            comparison_clip.extraction_worker.start()
+        self.comparison_clips.append(comparison_clip)
+        return comparison_clip
+
+    def remove_comparison_meshes(self):
+        for comparison_clip in self.comparison_clips:
+            self.open3d_scene.remove_geometry(comparison_clip.string_id)
+
+    def clear_comparison_clips(self):
+        self.remove_comparison_meshes()
+        for comparison_clip in self.comparison_clips:
+            if (comparison_clip.extraction_worker is not None):
+                comparison_clip.extraction_worker.cancel()
+        self.comparison_clips = []
+
+    def draw_comparison_meshes(self, frame):
+        """
+        Draws the comparison clips at the time of a frame of the selected clip.
+
+        Args:
+        - frame (int): Index of the current frame of the selected clip.
+        """
+        seconds = frame / float(self.motion_data.frame_rate)
+        self.remove_comparison_meshes()
+        if (self.mesh_state == MeshState.Hidden):
+            return
+        for comparison_clip in self.comparison_clips:
+            if (comparison_clip.poses.ready_frames == 0):
+                continue
+            pose = comparison_clip.poses[comparison_clip.frame_at(seconds)]
+            np.add(pose.vertices, comparison_clip.offset, out=comparison_clip.mesh.vertices)
+            np.copyto(comparison_clip.mesh.normals, pose.normals)
+            self.open3d_scene.add_geometry(comparison_clip.string_id, comparison_clip.mesh.geometry, self.mat_mesh)
+
+    def draw_frame(self, frame):
+        """
+        Draws the enabled arrows and the mesh for a specified frame.
+
+        Args:
+        - frame (int): Index of the current frame.
+        """
+        if (self.arrow_velocity.is_checked):
+            self.calculate_draw_velocity(frame)
 
-class VisualizationApp:
+        if (self.arrow_acceleration.is_checked):
+            self.calculate_draw_acceleration(frame)
 
-    def __init__(self):
+        self.draw_mesh(frame)
+
+    @profiled('draw_arraw')
+    def draw_arraw(self, mesh_joints, vectors, scaling_factor, arrow_info, arrow_setting):
+        """
+        Draws arrows representing vectors at joint positions in a scene.
+
+        Args:
+        - mesh_joints (array): An array of 3D coordinates for the joints where arrows will be placed.
+        - vectors (array): An array of 3D vectors representing the directions and magnitudes for the arrows.
+        - scaling_factor (array): An array containing scaling values for each arrow, used to adjust the size proportionally.
+        - arrow_info (object): An object containing properties used for drawing arrows.
+        - arrow_setting (object): An object that contains user-defined settings for arrow properties.
+
+        """
+        cylinder_transforms, cone_transforms = ArrowMeshBuilder.build_transforms(
+            mesh_joints, vectors, scaling_factor, arrow_setting)
+        arrow_info.mesh_builder.update(cylinder_transforms, cone_transforms)
+        self.open3d_scene.remove_geometry(arrow_info.string_id)
+        self.open3d_scene.add_geometry(arrow_info.string_id, arrow_info.mesh_builder.mesh.geometry, arrow_info.material)
+
+class VisualizationApp(MotionRenderer):
+    # Frames are not shown more often than the display refreshes, whatever the clip rate
+    display_interval = 1 / 60
+
+    def __init__(self, motion_catalog, memo_max_bytes=256 * 1024**2):
+        MotionRenderer.__init__(self, motion_catalog, memo_max_bytes=memo_max_bytes)
+        self.motions = motion_catalog.registry(motion_names)
         self.selected_amass_data = None
-        self.motion_data = AMASS_Motions[0]
+        self.pose_extraction_worker = None
+        self.motion_data = self.motions[0]
         self.animated_state = AnimationState.PAUSED
-        self.mesh_state = MeshState.Trasparent
         self.current_frame = 0
         self.joint_size = 1
-        self.total_time_point_cloud = 0
-        self.total_time_mesh = 0
-        self.frame_count = 0
-
-        # self.vel_max = 0
-        # self.acc_max = 0
 
         # --- Window & Scene ---
         self.window = gui.Application.instance.create_window(
@@ -159,15 +2074,8 @@ class VisualizationApp:
         w = self.window
         self.scene = gui.SceneWidget()
         self.scene.scene = rendering.Open3DScene(self.window.renderer)
-
-        self.scene.scene.scene.set_sun_light(
-            [0.577, -0.577, -0.577],  # direction
-            [1, 1, 1],  # color
-            45000)  # intensity
-        # self.scene.scene.scene.enable_sun_light(True)
-        self.scene.scene.scene.enable_sun_light(False)
-        self.scene.scene.show_skybox(True)
-        # self.scene.scene.set_background([0, 0, 0, 1])
+        self.open3d_scene = self.scene.scene
+        self.setup_lighting()
 
         bbox = o3d.geometry.AxisAlignedBoundingBox([-2, -2, -2],
                                                    [2, 2, 2])
@@ -186,11 +2094,27 @@ class VisualizationApp:
                                          gui.Margins(em, 0, 0, 0))
         
         self._combobox_amass_data = gui.Combobox()
-        for motion in AMASS_Motions:
+        for motion in self.motions:
             self._combobox_amass_data.add_item(motion.name)
         self._combobox_amass_data.set_on_selection_changed(self._on_combobox_amass_data)
         view_ctrls.add_child(gui.Label("AMASS Motion Dataset"))
         view_ctrls.add_child(self._combobox_amass_data)
+        self._extraction_progress = gui.ProgressBar()
+        view_ctrls.add_child(self._extraction_progress)
+
+        self._combobox_compare = gui.Combobox()
+        self._combobox_compare.add_item("Add clip to compare")
+        for motion in self.motions:
+            self._combobox_compare.add_item(motion.name)
+        self._combobox_compare.set_on_selection_changed(self._on_combobox_compare)
+        self._clear_compare_button = gui.Button("Clear")
+        self._clear_compare_button.horizontal_padding_em = 0.5
+        self._clear_compare_button.vertical_padding_em = 0
+        self._clear_compare_button.set_on_clicked(self._on_clear_compare_button)
+        h = gui.Horiz(0.25 * em)
+        h.add_child(self._combobox_compare)
+        h.add_child(self._clear_compare_button)
+        view_ctrls.add_child(h)
 
         view_ctrls.add_child(gui.Label("Play Controls"))
         self.play_slider = gui.Slider(gui.Slider.INT)
@@ -223,6 +2147,43 @@ class VisualizationApp:
         h.add_stretch()
         view_ctrls.add_child(h)
 
+        self.playback_scheduler = PlaybackScheduler()
+        self._combobox_speed = gui.Combobox()
+        for speed in playback_speeds:
+            self._combobox_speed.add_item(f"{speed}x")
+        self._combobox_speed.selected_index = playback_speeds.index(1.0)
+        def on_combobox_speed(name, index):
+            self.playback_scheduler.set_speed(playback_speeds[index])
+        self._combobox_speed.set_on_selection_changed(on_combobox_speed)
+        self._fps_label = gui.Label("")
+        self._fps_label_time = 0
+        grid = gui.VGrid(2, 0.25 * em)
+        grid.add_child(gui.Label("Playback speed"))
+        grid.add_child(self._combobox_speed)
+        grid.add_child(gui.Label("Frame rate"))
+        grid.add_child(self._fps_label)
+        view_ctrls.add_child(grid)
+
+        self._profiler_checkbox = gui.Checkbox("Profile stages (p50 / p95 / max)")
+        self._profiler_checkbox.set_on_checked(self._on_profiler_checkbox)
+        self._profiler_label = gui.Label("")
+        self._profiler_label.visible = False
+        self._profiler_save_button = gui.Button("Save profile")
+        self._profiler_save_button.horizontal_padding_em = 1
+        self._profiler_save_button.vertical_padding_em = 0
+        self._profiler_save_button.set_on_clicked(self._on_profiler_save_button)
+        self._profiler_reset_button = gui.Button("Reset")
+        self._profiler_reset_button.horizontal_padding_em = 1
+        self._profiler_reset_button.vertical_padding_em = 0
+        self._profiler_reset_button.set_on_clicked(self._on_profiler_reset_button)
+        self._profiler_buttons = gui.Horiz(0.25 * em)
+        self._profiler_buttons.add_child(self._profiler_save_button)
+        self._profiler_buttons.add_child(self._profiler_reset_button)
+        self._profiler_buttons.visible = False
+        view_ctrls.add_child(self._profiler_checkbox)
+        view_ctrls.add_child(self._profiler_label)
+        view_ctrls.add_child(self._profiler_buttons)
+
         view_ctrls.add_fixed(separation_height)
         view_ctrls.add_child(gui.Label("Mesh"))
         radio_button = gui.RadioButton(gui.RadioButton.VERT)
@@ -230,14 +2191,20 @@ class VisualizationApp:
         def on_radio_button_changed(idx):
             self.mesh_state = MeshState(idx)
             if (self.mesh_state == MeshState.Hidden):
-                self.scene.scene.remove_geometry('mesh')
-                self.scene.scene.remove_geometry('joints')
+                self.open3d_scene.remove_geometry('mesh')
+                self.open3d_scene.remove_geometry('joints')
+                self.remove_comparison_meshes()
             else:
                 self.draw_mesh(self.current_frame)
 
         radio_button.set_on_selection_changed(on_radio_button_changed)
         view_ctrls.add_child(radio_button)
 
+        self._lod_checkbox = gui.Checkbox("Reduce mesh detail when playback lags")
+        self._lod_checkbox.tooltip = "Stays in reduced detail until playback stops"
+        self._lod_checkbox.checked = True
+        view_ctrls.add_child(self._lod_checkbox)
+
         self.joint_size_slider = gui.Slider(gui.Slider.INT)
         self.joint_size_slider.set_limits(1, 5)
         self.joint_size_slider.set_on_value_changed(self._on_joint_size_slide)
@@ -257,7 +2224,18 @@ class VisualizationApp:
         self._velocity_checkbox.set_on_checked(self._on_velocity_checkbox)
         vis_ctrls.add_child(self._velocity_checkbox)
 
-        self.vel_arrow_setting = UserArrowSetting()
+
+        self._combobox_normalization = gui.Combobox()
+        for normalization_setting in normalization_settings:
+            self._combobox_normalization.add_item(normalization_setting.name)
+        def on_combobox_normalization(name, index):
+            self.normalization_setting = normalization_settings[index]
+            self.update_normalization()
+        self._combobox_normalization.set_on_selection_changed(on_combobox_normalization)
+        grid = gui.VGrid(2, 0.25 * em)
+        grid.add_child(gui.Label("Magnitude scale"))
+        grid.add_child(self._combobox_normalization)
+        vis_ctrls.add_child(grid)
 
         def on_vel_color(new_color):
             color = [
@@ -301,6 +2279,7 @@ class VisualizationApp:
         self.vel_smoothing_slider.set_limits(1, 10)
         def on_vel_smoothing_slider(size):
             self.vel_arrow_setting.smoothing_size = int(size)
+            self.velocity_field = None
         self.vel_smoothing_slider.set_on_value_changed(on_vel_smoothing_slider)
         grid = gui.VGrid(2, 0.9 * em)
         grid.add_child(gui.Label("Smoothing window size"))
@@ -313,7 +2292,6 @@ class VisualizationApp:
         self._acceleration_checkbox.set_on_checked(self._on_acceleration_checkbox)
         vis_ctrls.add_child(self._acceleration_checkbox)
 
-        self.acc_arrow_setting = UserArrowSetting()
 
         def on_acc_color(new_color):
             color = [
@@ -357,6 +2335,7 @@ class VisualizationApp:
         self.acc_smoothing_slider.set_limits(1, 10)
         def on_acc_smoothing_slider(size):
             self.acc_arrow_setting.smoothing_size = int(size)
+            self.acceleration_field = None
         self.acc_smoothing_slider.set_on_value_changed(on_acc_smoothing_slider)
         grid = gui.VGrid(2, 0.9 * em)
         grid.add_child(gui.Label("Smoothing window size"))
@@ -428,10 +2407,22 @@ class VisualizationApp:
         self._plot_button.vertical_padding_em = 0
         self._plot_button.set_on_clicked(self._on_plot_button)
 
+        self._plot_zoom_checkbox = gui.Checkbox("Plot frames around playhead")
+
         grid = gui.VGrid(2, 2 * em)
         grid.add_child(self._checkbox_select_all)
         grid.add_child(self._plot_button)
         joint_ctrls.add_child(grid)
+        joint_ctrls.add_child(self._plot_zoom_checkbox)
+
+        self.joint_angle_chart = JointAngleChart()
+        self._chart_checkbox = gui.Checkbox("Live chart")
+        self._chart_checkbox.set_on_checked(self._on_chart_checkbox)
+        self._chart_image = gui.ImageWidget(o3d.geometry.Image(self.joint_angle_chart.ring))
+        self._chart_image.visible = False
+        joint_ctrls.add_child(self._chart_checkbox)
+        joint_ctrls.add_child(gui.Label("Angles, velocities and accelerations"))
+        joint_ctrls.add_child(self._chart_image)
 
         self._checkbox_torso = gui.Checkbox("Torso")
         self._checkbox_torso.set_on_checked(partial(on_checkbox_checked, torso_indices))
@@ -506,62 +2497,44 @@ class VisualizationApp:
         w.add_child(self.scene)
         w.add_child(self._settings_panel)
 
-        # ---- Open3D ----
-        # SMPLX
-        self.initialize_open3d()
-
         # initialize AMASS dataset
         self.set_motion_data(0)
 
-    def initialize_open3d(self):
-        self.model_folder = './dataset/models_lockedhead/'
-        self.model = smplx.create(self.model_folder, model_type='smplx',
-                                gender='neutral', use_face_contour=False,
-                                num_betas=0,
-                                num_expression_coeffs=0,
-                                ext='npz')
-        # Materials
-        self.mat_mesh = o3d.visualization.rendering.MaterialRecord()
-        self.mat_mesh.shader = "defaultLitTransparency"
-        self.mat_mesh.base_roughness = 0.0
-        self.mat_mesh.base_reflectance = 0.0
-        self.mat_mesh.base_clearcoat = 1.0
-        self.mat_mesh.thickness = 1.0
-        self.mat_mesh.transmission = 1.0
-        self.mat_mesh.absorption_distance = 10
-        self.mat_mesh.absorption_color = [0.5, 0.5, 0.5]
-        self.mat_mesh.base_color = [0.467, 0.467, 0.467, 0.2]
-        self.mat_mesh.base_color = [0.3, 0.3, 0.3, 0.5]
-
-        self.mat_dot = o3d.visualization.rendering.MaterialRecord()
-        self.mat_dot.shader = 'defaultLit'
-        self.mat_dot.base_color = [0.8, 0, 0, 1.0]
-        self.mat_dot.point_size = 5
-
-        self.arrow_velocity = Arrow(ArrowType.Velocity, "arrow_vel", False)
-        self.arrow_acceleration = Arrow(ArrowType.Acceleration, "arrow_acc", False)
-
-        self.arrow_velocity.material.shader = 'defaultLit'
-        self.arrow_velocity.material.base_color = [1, 1, 0, 1.0]
-
-        self.arrow_acceleration.material.shader = 'defaultLit'
-        self.arrow_acceleration.material.base_color = [1, 0, 0, 1.0]
-
-        # Mesh and Joints
-        self.mesh = o3d.geometry.TriangleMesh()
-        self.joints_pcl = o3d.geometry.PointCloud()
-    
     def set_motion_data(self, frame_index): 
         self.current_frame = 0
-        self.motion_data = AMASS_Motions[frame_index]
-        self.play_slider.set_limits(1, self.motion_data.num_frames - 1)
+        self.motion_data = self.motions.select(frame_index)
         self.play_slider.int_value = self.current_frame
-        self.extract_pose_from_amass()
+        self.velocity_field = None
+        self.acceleration_field = None
+        self.joint_angle_data = self.motion_memo.get(self.memo_key('joint_angle_data'))
+        if (self.joint_angle_data is None):
+            self.joint_angle_data = JointAngleData(self.motion_data.num_frames)
+        self.joint_angle_chart.set_data(None)
         self.remove_vel_arrows()
         self.remove_acc_arrows()
-        self.draw_mesh(self.current_frame)
-        self.joint_angle_data = JointAngleData(self.motion_data.num_frames)
+        self.extract_pose_from_amass()
     
+    def _on_pose_extraction_progress(self, poses):
+        """
+        Makes newly extracted frames available to the slider and playback. Runs on the main thread.
+
+        Args:
+        - poses (MotionBuffer): Buffer the progress is reported for. Ignored if another clip was selected since.
+        """
+        if (poses is not self.poses):
+            return
+        self._extraction_progress.value = poses.ready_frames / poses.num_frames
+        self.play_slider.set_limits(1, max(1, poses.ready_frames - 1))
+        self._plot_button.enabled = poses.is_complete
+        if (poses.is_complete and not self.joint_angle_chart.has_data):
+            self.update_chart()
+        if (poses.ready_frames >= 2):
+            self.update_normalization()
+        if (self.animated_state == AnimationState.PAUSED):
+            # Shows the paused frame once it is ready
+            self.draw_mesh(self.current_frame)
+        self.window.post_redraw()
+
     def _on_layout(self, layout_context):
         r = self.window.content_rect
         self.scene.frame = r
@@ -577,6 +2550,30 @@ class VisualizationApp:
         self.animated_state = AnimationState.PAUSED
         self.set_motion_data(index)
     
+    def _on_combobox_compare(self, name, index):
+        if (index == 0):
+            return
+        self._combobox_compare.selected_index = 0
+        motion = self.motions[index - 1]
+        def on_progress(comparison_clip):
+            gui.Application.instance.post_to_main_thread(
+                self.window, partial(self._on_comparison_extraction_progress, comparison_clip))
+        self.add_comparison_clip(motion, on_progress)
+        # An extraction worker keeps its own reference to the pose parameters
+        self.motions.release(motion)
+        if (self.animated_state == AnimationState.PAUSED):
+            self.draw_mesh(self.current_frame)
+
+    def _on_comparison_extraction_progress(self, comparison_clip):
+        """
+        Redraws the paused frame with the newly extracted frames of a comparison clip. Runs on the main thread.
+        """
+        if (comparison_clip in self.comparison_clips and self.animated_state == AnimationState.PAUSED):
+            self.draw_mesh(self.current_frame)
+
+    def _on_clear_compare_button(self):
+        self.clear_comparison_clips()
+
     def _on_play_slider(self, size):
         self.current_frame = int(size)
 
@@ -588,6 +2585,65 @@ class VisualizationApp:
                 self.calculate_draw_velocity(self.current_frame)
             if (self.arrow_acceleration.is_checked):
                 self.calculate_draw_acceleration(self.current_frame)
+            self.update_chart()
+            self.update_profiler_label()
+
+    def _on_profiler_checkbox(self, is_checked):
+        self.profiler.enabled = is_checked
+        self._profiler_label.visible = is_checked
+        self._profiler_buttons.visible = is_checked
+        self.update_profiler_label()
+        self.window.set_needs_layout()
+
+    def update_profiler_label(self):
+        if (self.profiler.enabled):
+            self._profiler_label.text = self.profiler.report()
+
+    def _on_profiler_save_button(self):
+        path = time.strftime('./profile_%Y%m%d_%H%M%S.json')
+        self.save_profile(path)
+        self._profiler_label.text = f"{self.profiler.report()}\nSaved to {path}"
+
+    def _on_profiler_reset_button(self):
+        """
+        Clears the timers and the per-frame averages, e.g. to profile a single playback.
+        """
+        self.profiler.reset()
+        self.total_time_point_cloud = 0
+        self.total_time_mesh = 0
+        self.frame_count = 0
+        self.update_profiler_label()
+
+    def save_profile(self, path):
+        """
+        Writes the profiler timers and the average joint and mesh update times per frame to a JSON file.
+        """
+        frame_count = max(self.frame_count, 1)
+        self.profiler.dump(path, {
+            'motion': self.motion_data.name,
+            'frame_count': self.frame_count,
+            'point_cloud_ms_per_frame': self.total_time_point_cloud / frame_count * 1000,
+            'mesh_ms_per_frame': self.total_time_mesh / frame_count * 1000,
+            'playback': self.playback_scheduler.report()
+        })
+
+    def _on_chart_checkbox(self, is_checked):
+        self._chart_image.visible = is_checked
+        self.update_chart()
+        self.window.set_needs_layout()
+
+    @profiled('update_chart')
+    def update_chart(self):
+        """
+        Scrolls the live joint angle chart to the current frame. The joint angles are computed once the clip is complete.
+        """
+        if (not self._chart_checkbox.checked or not self.poses.is_complete):
+            return
+        if (not self.joint_angle_chart.has_data):
+            if (self.joint_angle_data.isEmpty):
+                self.calculate_joint_angle_vel_acc()
+            self.joint_angle_chart.set_data(self.joint_angle_data)
+        self._chart_image.update_image(o3d.geometry.Image(self.joint_angle_chart.update(self.current_frame)))
 
     def _on_button_reset(self):
         self.animated_state = AnimationState.PAUSED
@@ -597,6 +2653,8 @@ class VisualizationApp:
         self.remove_vel_arrows()
         self.remove_acc_arrows()
         self.draw_mesh(0)
+        self.update_chart()
+        self.update_profiler_label()
 
     def _on_button_play(self):
         self.remove_vel_arrows()
@@ -625,6 +2683,8 @@ class VisualizationApp:
 
     def _on_joint_size_slide(self, size):
         self.mat_dot.point_size = 4 + int(size)
+        if (self.open3d_scene.has_geometry('joints')):
+            self.open3d_scene.modify_geometry_material('joints', self.mat_dot)
 
     def _on_velocity_checkbox(self, is_checked):
         self.arrow_velocity.is_checked = is_checked
@@ -641,99 +2701,79 @@ class VisualizationApp:
             self.calculate_draw_acceleration(self.current_frame)
 
     def _on_plot_button(self):
+        if (not self.poses.is_complete):
+            return
         if (self.joint_angle_data.isEmpty):
             self.calculate_joint_angle_vel_acc()
-        self.draw_plot()
-
-    def remove_vel_arrows(self):
-        for j in range(24):
-            self.scene.scene.remove_geometry(self.arrow_velocity.string_id + str(j))
-
-    def remove_acc_arrows(self):
-        for j in range(24):
-            self.scene.scene.remove_geometry(self.arrow_acceleration.string_id + str(j))
+        if (self._plot_zoom_checkbox.checked):
+            start_frame = max(0, self.current_frame - PlotDecimator.max_points // 2)
+            self.draw_plot(start_frame, min(self.motion_data.num_frames, start_frame + PlotDecimator.max_points))
+        else:
+            self.draw_plot()
 
+    @profiled('extract_pose_from_amass')
     def extract_pose_from_amass(self):
-        self.poses = []
-        for i in range(0, self.motion_data.num_frames):
-            global_orient = torch.tensor(self.motion_data.dataset['root_orient'][i, :3].reshape(1, 3), dtype=torch.float32)
-            pose1 = torch.tensor(self.motion_data.dataset['pose_body'][i, :63].reshape(1, 63), dtype=torch.float32)
-            model = self.model(global_orient=global_orient, body_pose=pose1, betas=None)
-            translation = self.motion_data.dataset['trans'][i, :3].reshape(1, 3)
-            joint_positions = model.joints.detach().cpu().numpy().squeeze()
-            indices = np.r_[0:22, 37, 52]
-            joint_positions = joint_positions[indices] + translation
-            vertices = model.vertices.detach().cpu().numpy().squeeze() + translation
-            self.poses.append(Pose(joint_positions, vertices))
+        """
+        Loads the poses of the current clip from the pose cache, or starts a background
+        worker that extracts them. Frames become available progressively.
+        """
+        if (self.pose_extraction_worker is not None):
+            sharing_clips = [clip for clip in self.comparison_clips if clip.poses is self.poses]
+            if (sharing_clips):
+                # Keep extracting the previous clip for the comparison clips drawing its buffer
+                sharing_clips[0].extraction_worker = self.pose_extraction_worker
+            else:
+                self.pose_extraction_worker.cancel()
+            self.pose_extraction_worker = None
+
+        self.poses, self.pose_cache_key, needs_poses = MotionBuffer.open(self.motion_data, self.pose_extractor, self.pose_cache)
+        if (not self.poses.is_complete):
+            def on_progress(poses):
+                gui.Application.instance.post_to_main_thread(
+                    self.window, partial(self._on_pose_extraction_progress, poses))
+            self.pose_extraction_worker = PoseExtractionWorker(
+                self.pose_extractor, self.vertex_normal_estimator, self.pose_cache, self.pose_cache_key,
+                self.motion_data.dataset, self.poses, needs_poses, on_progress,
+                chunk_size=self.pose_extractor.batch_size, profiler=self.profiler)
+            self.pose_extraction_worker.start()
+        self._on_pose_extraction_progress(self.poses)
 
     def calculate_joint_angle_vel_acc(self):
-        for i in range(0, self.motion_data.num_frames):
-            vectors = [0] * 24
-            for joint in joints:
-                if (joint.parent_index != None):
-                    parent_position = self.poses[i].joints[joint.parent_index]
-                    current_position = self.poses[i].joints[joint.index]
-                    vectors[joint.index] = JointAngleManager.calcuate_vector_pointed_from_parent(current_position, parent_position)
-
-            for joint in joints:
-                if (joint.child_index != None) :
-                    # Joint angle
-                    joint_angle = round(JointAngleManager.find_joint_angle(vectors[joint.index], vectors[joint.child_index]))
-                    self.joint_angle_data.angles[joint.index, i] = joint_angle - joint.referecne_angle
-                    # Joint angular velocity
-                    if (i > 0):
-                        self.joint_angle_data.velocities[joint.index, i-1] = self.joint_angle_data.angles[joint.index, i] - self.joint_angle_data.angles[joint.index, i-1]
-                        self.joint_angle_data.velocities[joint.index, i-1] /= (1 / self.motion_data.frame_rate)
-                    # Joint angular acceleeration
-                    if (i > 1):
-                        self.joint_angle_data.accelertions[joint.index, i-1] = self.joint_angle_data.velocities[joint.index, i-1] - self.joint_angle_data.velocities[joint.index, i-2]
-                        self.joint_angle_data.accelertions[joint.index, i-1] /= (1 / self.motion_data.frame_rate)
-        self.joint_angle_data.isEmpty = False
-                        
-    def draw_plot(self):
-        fig = make_subplots(rows=3, cols=1, subplot_titles=("Joint Angles", "Velocities", "Accelerations"), vertical_spacing=0.1)
+        self.joint_angle_data = JointAngleManager.calculate_joint_angle_data(self.poses.joints, self.motion_data.frame_rate)
+        self.motion_memo.store(self.memo_key('joint_angle_data'), self.joint_angle_data)
 
-        for i in range(22):
-            if (joints[i].child_index != None and joints[i].is_checked):
-                fig.add_trace(
-                    go.Scatter(
-                        x=list(range(self.motion_data.num_frames)),
-                        y=self.joint_angle_data.angles[i, :],
-                        mode='lines',
-                        name=joints[i].name,
-                        line=dict(color=joints[i].color),
-                        legendgroup='group1',
-                        showlegend=True,
-                    ),
-                    row=1, col=1
-                )
+    def draw_plot(self, start_frame=0, end_frame=None):
+        """
+        Plots joint angles, velocities and accelerations of the checked joints in the browser.
 
-        for i in range(22):
-             if (joints[i].child_index != None and joints[i].is_checked):
-                fig.add_trace(
-                    go.Scatter(
-                        x=list(range(self.motion_data.num_frames)),
-                        y=self.joint_angle_data.velocities[i, :],
-                        mode='lines',
-                        name=joints[i].name,
-                        line=dict(color=joints[i].color),
-                        showlegend=False
-                    ),
-                    row=2, col=1
-                )
+        Series longer than 'PlotDecimator.max_points' are decimated, so a frame range
+        has to be plotted to see it at full resolution.
 
-        for i in range(22):
-            if (joints[i].child_index != None and joints[i].is_checked):
+        Args:
+        - start_frame (int): First frame of the plotted range.
+        - end_frame (int): End of the plotted range (exclusive). Defaults to the end of the clip.
+        """
+        fig = make_subplots(rows=3, cols=1, subplot_titles=("Joint Angles", "Velocities", "Accelerations"), vertical_spacing=0.1)
+        end_frame = self.motion_data.num_frames if end_frame is None else end_frame
+        checked_joints = [joint for joint in joints[:22] if joint.child_index != None and joint.is_checked]
+        joint_indices = [joint.index for joint in checked_joints]
+        series = [self.joint_angle_data.angles, self.joint_angle_data.velocities, self.joint_angle_data.accelertions]
+
+        for row, values in enumerate(series):
+            values = values[joint_indices, start_frame:end_frame]
+            frame_indices = PlotDecimator.min_max_indices(values)
+            for joint, y, x in zip(checked_joints, values, frame_indices):
                 fig.add_trace(
-                    go.Scatter(
-                        x=list(range(self.motion_data.num_frames)),
-                        y=self.joint_angle_data.accelertions[i, :],
+                    go.Scattergl(
+                        x=x + start_frame,
+                        y=y[x],
                         mode='lines',
-                        name=joints[i].name,
-                        line=dict(color=joints[i].color),
-                        showlegend=False
+                        name=joint.name,
+                        line=dict(color=joint.color),
+                        legendgroup=joint.name,
+                        showlegend=(row == 0)
                     ),
-                    row=3, col=1
+                    row=row + 1, col=1
                 )
 
         fig.update_layout(
@@ -742,185 +2782,545 @@ class VisualizationApp:
         )
         fig.show()
 
-    def calculate_draw_velocity(self, frame):
-        """
-        Computes and visualizes joint velocities for a specified frame based on smoothing settings
-         and passes the computed velocity vectors to 'draw_arrow()'.
-
-        Args:
-        - frame (int): Index of the current frame.
-        """
-        window_size = self.vel_arrow_setting.smoothing_size
-        if (frame >= self.motion_data.num_frames - 1):
+    def play_motion(self):
+        if (self.motion_data == None):
             return
-        start_index = max(0, frame - math.floor(window_size/2))
-        end_index = min(self.motion_data.num_frames-1, frame + math.ceil(window_size/2))
-        vector_tail = np.zeros((24, 3))
-        vector_head = np.zeros((24, 3))
-        for j in range(start_index, end_index):
-            vector_tail += self.poses[j].joints
-            vector_head += self.poses[j+1].joints
-        vector_tail /= window_size
-        vector_head /= window_size
-
-        # Calculate velocity vectors and magnitudes
-        difference_vectors = vector_head - vector_tail 
-        vectors = difference_vectors / (1 / self.motion_data.frame_rate)
-        magnitudes = np.linalg.norm(vectors, axis=1)
-        scaling_factor = magnitudes / self.motion_data.max_vel 
-        # self.vel_max = np.max(magnitudes) if self.vel_max < np.max(magnitudes) else self.vel_max
-        self.draw_arraw(self.poses[frame].joints, vectors, scaling_factor, self.arrow_velocity, self.vel_arrow_setting)
 
-    def calculate_draw_acceleration(self, frame):
+        direction = None
+        rendered_frame = None
+        running = True
+        self.frame_time_average = None
+        self.frame_time_count = 0
+        while running:
+            state_direction = 1 if self.animated_state == AnimationState.PLAYING else -1
+            if (state_direction != direction or self.current_frame != rendered_frame):
+                # (Re)start the clock when playback starts, changes direction or the slider was moved
+                direction = state_direction
+                self.playback_scheduler.start(self.current_frame, direction, self.motion_data.frame_rate)
+                frame = self.current_frame
+            else:
+                frame = self.playback_scheduler.target_frame()
+            frame = min(max(frame, 0), self.motion_data.num_frames - 1)
+            if (frame >= self.poses.ready_frames - 1 and not self.poses.is_complete):
+                # Wait at the last extracted frame until more frames are ready
+                frame = max(0, self.poses.ready_frames - 2)
+                self.playback_scheduler.start(frame, direction, self.motion_data.frame_rate)
+
+            if (frame != rendered_frame):
+                draw_start_time = time.perf_counter()
+                self.current_frame = frame
+                with self.profiler.timer('frame'):
+                    self.draw_frame(self.current_frame)
+                    self.update_chart()
+                self.update_level_of_detail(time.perf_counter() - draw_start_time)
+                self.frame_count += 1
+                self.playback_scheduler.frame_rendered(self.current_frame)
+                rendered_frame = self.current_frame
+                self.play_slider.int_value = self.current_frame
+                if (time.perf_counter() - self._fps_label_time > 0.5):
+                    self._fps_label.text = self.playback_scheduler.report()
+                    self.update_profiler_label()
+                    self._fps_label_time = time.perf_counter()
+            else:
+                # Wait for the next frame to be due without blocking the UI for long
+                time.sleep(min(self.playback_scheduler.time_to_next_frame(), 0.005))
+
+            with self.profiler.timer('run_one_tick'):
+                tick_return = gui.Application.instance.run_one_tick()
+            if tick_return:
+                self.window.post_redraw()
+                
+            if (self.animated_state == AnimationState.PAUSED):
+                running = False
+            if (self.animated_state == AnimationState.PLAYING
+                and self.current_frame >= (self.motion_data.num_frames - 1)): 
+                running = False
+                self.animated_state = AnimationState.PAUSED
+            if (self.animated_state == AnimationState.REVERSE and self.current_frame < 1):
+                running = False
+                self.animated_state = AnimationState.PAUSED
+
+        if (self.use_low_detail):
+            # Show the paused frame in full detail
+            self.use_low_detail = False
+            self.draw_mesh(self.current_frame)
+        self.update_profiler_label()
+
+    def update_level_of_detail(self, frame_time):
         """
-        Computes joint acceleration for a specified frame based on smoothing settings
-         and passes the computed acceleration vectors to 'draw_arrow()'.
+        Switches playback to the decimated mesh once the average time spent drawing a frame
+        exceeds the frame budget. The budget is the frame interval of the clip at the current
+        playback speed, but never less than the display interval, since the UI tick waits for
+        the display anyway and is not counted. Once switched, the decimated mesh is kept until
+        playback stops, as the time of a full detail frame can not be measured while it is not drawn.
 
         Args:
-        - frame (int): Index of the current frame.
+        - frame_time (float): Time in seconds spent drawing the last frame.
         """
-        window_size = self.acc_arrow_setting.smoothing_size
-        if (frame >= self.motion_data.num_frames - 1):
+        if (not self._lod_checkbox.checked or self.use_low_detail):
             return
-        start_index = max(0, frame - math.floor(window_size/2))
-        end_index = min(self.motion_data.num_frames-1, frame + math.ceil(window_size/2) + 1)
-        velocity_vectors = []
-        for j in range(start_index, end_index):
-            velocity = (self.poses[j+1].joints - self.poses[j].joints) / (1 / self.motion_data.frame_rate)
-            velocity_vectors.append(velocity)
-
-        vectors = np.zeros((24, 3))
-        for j in range(0, len(velocity_vectors)-1):
-            vectors += (velocity_vectors[j+1] - velocity_vectors[j]) / (1 / self.motion_data.frame_rate)
-        vectors /= (len(velocity_vectors) - 1)
-        magnitudes = np.linalg.norm(vectors, axis=1)
-        normalized_magnitudes = magnitudes / self.motion_data.max_acc
-        # self.acc_max = np.max(magnitudes) if self.acc_max < np.max(magnitudes) else self.acc_max
-        self.draw_arraw(self.poses[frame].joints, vectors, normalized_magnitudes, self.arrow_acceleration, self.acc_arrow_setting)
-
-    def draw_mesh(self, frame):
+        if (self.frame_time_average is None):
+            self.frame_time_average = frame_time
+        else:
+            self.frame_time_average = 0.9 * self.frame_time_average + 0.1 * frame_time
+        self.frame_time_count += 1
+        frame_budget = max(1 / self.playback_scheduler.target_fps, VisualizationApp.display_interval)
+        if (self.frame_time_count >= 10 and self.frame_time_average > frame_budget):
+            if (self.mesh_lod is None):
+                self.build_level_of_detail()
+            self.use_low_detail = True
+
+    @profiled('build_level_of_detail')
+    def build_level_of_detail(self):
         """
-        Visualize a human body mesh in a scene for a specified frame.
+        Decimates the body model for 'use_low_detail'. Only done once, the first time playback lags.
+        """
+        self.mesh_lod = MeshLevelOfDetail(self.model.v_template.detach().cpu().numpy(), self.model.faces)
+        self.lod_mesh = TensorMesh(self.mesh_lod.num_vertices, TensorMesh.triangle_tensor(self.mesh_lod.faces))
+
+class MotionStreamPlayer(MotionRenderer):
+    """
+    Plays a pose source, such as a live mocap feed, from a MotionStream in its own window.
+
+    Memory use is bounded by the stream capacity regardless of the length of the source.
+    Arrows are scaled by the largest magnitudes seen so far.
+    """
+    extraction_batch_size = 32
+
+    def __init__(self, source, capacity=256, model_folder='./dataset/models_lockedhead/'):
+        MotionRenderer.__init__(self, model_folder=model_folder)
+        self.stream = MotionStream(source, self.pose_extractor, self.vertex_normal_estimator, capacity)
+        self.poses = self.stream
+        self.playback_scheduler = PlaybackScheduler()
+        self.current_frame = None
+        self.is_running = True
+        self.vel_max = 1e-6
+        self.acc_max = 1e-6
+
+        self.window = gui.Application.instance.create_window("Human Motion Stream", 1024, 768)
+        w = self.window
+        self.scene = gui.SceneWidget()
+        self.scene.scene = rendering.Open3DScene(self.window.renderer)
+        self.open3d_scene = self.scene.scene
+        self.setup_lighting()
+        bbox = o3d.geometry.AxisAlignedBoundingBox([-2, -2, -2], [2, 2, 2])
+        self.scene.setup_camera(45, bbox, [1,0,0])
+        self.scene.look_at([0,0,0], [-2, -5, 1], [0,0,1])
 
-        Args:
-        - frame (int): Index of the current frame.
+        em = w.theme.font_size
+        self._settings_panel = gui.Vert(0, gui.Margins(0.25 * em, 0.25 * em, 0.25 * em, 0.25 * em))
+        self._status_label = gui.Label("Waiting for frames")
+        self._settings_panel.add_child(self._status_label)
+        velocity_checkbox = gui.Checkbox("Velocity")
+        velocity_checkbox.set_on_checked(self._on_velocity_checkbox)
+        self._settings_panel.add_child(velocity_checkbox)
+        acceleration_checkbox = gui.Checkbox("Acceleration")
+        acceleration_checkbox.set_on_checked(self._on_acceleration_checkbox)
+        self._settings_panel.add_child(acceleration_checkbox)
+
+        w.set_on_layout(self._on_layout)
+        w.set_on_close(self._on_close)
+        w.add_child(self.scene)
+        w.add_child(self._settings_panel)
+
+        self.stream.start()
+        threading.Thread(target=self._run_clock, daemon=True).start()
+
+    def _on_layout(self, layout_context):
+        r = self.window.content_rect
+        self.scene.frame = r
+        width = 15 * layout_context.theme.font_size
+        height = self._settings_panel.calc_preferred_size(layout_context, gui.Widget.Constraints()).height
+        self._settings_panel.frame = gui.Rect(r.get_right() - width, r.y, width, min(r.height, height))
+
+    def _on_close(self):
+        self.is_running = False
+        self.stream.cancel()
+        return True
+
+    def _on_velocity_checkbox(self, is_checked):
+        self.arrow_velocity.is_checked = is_checked
+        if (not is_checked):
+            self.remove_vel_arrows()
+
+    def _on_acceleration_checkbox(self, is_checked):
+        self.arrow_acceleration.is_checked = is_checked
+        if (not is_checked):
+            self.remove_acc_arrows()
+
+    def _run_clock(self):
+        while (self.is_running):
+            gui.Application.instance.post_to_main_thread(self.window, self.tick)
+            time.sleep(0.5 / self.stream.frame_rate)
+
+    def tick(self):
         """
-        if (frame >= self.motion_data.num_frames - 1): 
+        Draws the frame that is due, waiting at the newest skinned frame when the stream falls behind. Runs on the main thread.
+        """
+        if (self.stream.ready_frames < 2):
             return
-        
-        self.scene.scene.remove_geometry('mesh')
-        self.scene.scene.remove_geometry('joints')
-        
-        if (self.mesh_state == MeshState.Hidden or self.mesh_state == MeshState.Trasparent):
-            self.joints_pcl.points = o3d.utility.Vector3dVector(self.poses[frame].joints)
-            self.scene.scene.add_geometry('joints', self.joints_pcl, self.mat_dot)
+        if (self.current_frame is None):
+            self.playback_scheduler.start(0, 1, self.stream.frame_rate)
+        frame = self.playback_scheduler.target_frame()
+        if (frame > self.stream.ready_frames - 2):
+            frame = self.stream.ready_frames - 2
+            self.playback_scheduler.start(frame, 1, self.stream.frame_rate)
+        if (frame == self.current_frame):
+            return
+        self.current_frame = frame
+        self.stream.seek(frame)
+        self.draw_frame(frame)
+        self.playback_scheduler.frame_rendered(frame)
+        self._status_label.text = f"Frame {frame}, {self.stream.ready_frames - frame} buffered\n{self.playback_scheduler.report()}"
+        self.window.post_redraw()
+
+    def windowed_field(self, field_function, frame, window_size):
+        """
+        Computes a velocity or acceleration field over the buffered frames around a frame and returns its vectors at that frame.
+        """
+        margin = 2 * window_size + 2
+        window_joints, start = self.stream.joint_window(frame - margin, frame + margin + 1)
+        return field_function(window_joints, self.stream.frame_rate, window_size)[frame - start]
 
-        if (self.mesh_state != MeshState.Hidden):
-            self.mesh.vertices = o3d.utility.Vector3dVector(self.poses[frame].vertices)
-            self.mesh.triangles = o3d.utility.Vector3iVector(self.model.faces)
-            if (self.mesh_state == MeshState.Trasparent):
-                self.mat_mesh.shader = 'defaultLitTransparency'
-                self.mesh.compute_vertex_normals()
-            elif (self.mesh_state == MeshState.Opaque):
-                self.mat_mesh.shader = 'defaultLit'
-            self.scene.scene.add_geometry('mesh', self.mesh, self.mat_mesh)
+    @profiled('velocity')
+    def calculate_draw_velocity(self, frame):
+        vectors = self.windowed_field(MotionKinematics.velocity_field, frame, self.vel_arrow_setting.smoothing_size)
+        magnitudes = np.linalg.norm(vectors, axis=1)
+        self.vel_max = max(self.vel_max, np.nanmax(magnitudes))
+        self.draw_arraw(self.stream[frame].joints, vectors, magnitudes / self.vel_max, self.arrow_velocity, self.vel_arrow_setting)
 
-    def draw_arraw(self, mesh_joints, vectors, scaling_factor, arrow_info, arrow_setting):
-        """
-        Draws arrows representing vectors at joint positions in a scene.
+    @profiled('acceleration')
+    def calculate_draw_acceleration(self, frame):
+        vectors = self.windowed_field(MotionKinematics.acceleration_field, frame, self.acc_arrow_setting.smoothing_size)
+        magnitudes = np.linalg.norm(vectors, axis=1)
+        self.acc_max = max(self.acc_max, np.nanmax(magnitudes))
+        self.draw_arraw(self.stream[frame].joints, vectors, magnitudes / self.acc_max, self.arrow_acceleration, self.acc_arrow_setting)
 
-        Args:
-        - mesh_joints (array): An array of 3D coordinates for the joints where arrows will be placed.
-        - vectors (array): An array of 3D vectors representing the directions and magnitudes for the arrows.
-        - scaling_factor (array): An array containing scaling values for each arrow, used to adjust the size proportionally.
-        - arrow_info (object): An object containing properties used for drawing arrows.
-        - arrow_setting (object): An object that contains user-defined settings for arrow properties.
+class FrameWriter:
+    """
+    Streams rendered frames to a video file through an ffmpeg pipe, or to numbered PNG files in a folder.
 
-        """
-        self.arrows = [0] * 24
-        for j in range(24):
-            if (np.all(vectors[j] == 0) or np.isnan(vectors[j]).any()):
-                continue
-            start_position = mesh_joints[j]
-            end_position = start_position + vectors[j]
-            default_direction = np.array([0, 0, 1]) # arrow along the z-axis
-            direction = np.array(end_position) - np.array(start_position)
-            direction /= np.linalg.norm(direction)  # normalizations
-
-            # Find a rotational matrix from the direction vector
-            v = np.cross(default_direction, direction)
-            w = np.sqrt(np.linalg.norm(default_direction)**2 * np.linalg.norm(direction)**2) + np.dot(default_direction, direction)
-            quaternion = np.array([w, v[0], v[1], v[2]])
-            quaternion /= np.linalg.norm(quaternion)
-            R = o3d.geometry.get_rotation_matrix_from_quaternion(quaternion)
-
-            # Transformation matrices
-            rotation_matrix = np.identity(4)
-            rotation_matrix[:3, :3] = R
-            translation_matrix = np.identity(4)
-            translation_matrix[:3, 3] = start_position
-            scailing = arrow_setting.arrow_size
-            if arrow_setting.is_scailing_enabled:
-                scailing *= scaling_factor[j]
-            scailing = min(1.5, scailing) # if scailing > 1.5, only the length of the arrows gets scaled
-
-            height_scailing = arrow_setting.arrow_size 
-            if arrow_setting.is_scailing_enabled:
-                height_scailing *= scaling_factor[j]
-
-            self.arrows[j] = o3d.geometry.TriangleMesh.create_arrow(cylinder_radius=0.007 * scailing,
-                                                    cone_radius=0.015 * scailing,
-                                                    cylinder_height=0.1 * height_scailing,
-                                                    cone_height=0.04 * scailing)
-            self.arrows[j].compute_vertex_normals()
-
-            self.arrows[j].transform(rotation_matrix)
-            self.arrows[j].transform(translation_matrix)
-
-            self.scene.scene.remove_geometry(arrow_info.string_id + str(j))
-            self.scene.scene.add_geometry(arrow_info.string_id + str(j), self.arrows[j], arrow_info.material)
+    Frames are written as they are rendered, so a clip never has to fit in memory.
+    """
+    video_extensions = ('.mp4', '.mkv', '.avi', '.mov')
 
-    def play_motion(self):
-        if (self.motion_data == None):
-            return
-        
-        # self.vel_max = 0
-        # self.acc_max = 0
+    def __init__(self, path, frame_rate):
+        self.path = path
+        self.frame_rate = frame_rate
+        self.is_video = os.path.splitext(path)[1].lower() in FrameWriter.video_extensions
+        self.process = None
+        self.frame_count = 0
+        if (self.is_video and shutil.which('ffmpeg') is None):
+            raise RuntimeError("ffmpeg is required to write videos, use the 'png' format instead")
+        if (not self.is_video):
+            os.makedirs(path, exist_ok=True)
 
-        running = True
-        while running:
-            if (self.arrow_velocity.is_checked):
-                self.calculate_draw_velocity(self.current_frame)
+    def __enter__(self):
+        return self
 
-            if (self.arrow_acceleration.is_checked):
-                self.calculate_draw_acceleration(self.current_frame)
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
-            self.draw_mesh(self.current_frame)
+    def write(self, image):
+        """
+        Args:
+        - image (o3d.geometry.Image): An RGB image as returned by 'OffscreenRenderer.render_to_image()'.
+        """
+        if (self.is_video):
+            pixels = np.asarray(image)
+            if (self.process is None):
+                height, width = pixels.shape[:2]
+                self.process = subprocess.Popen(
+                    ['ffmpeg', '-y', '-loglevel', 'error',
+                     '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{width}x{height}', '-r', f'{self.frame_rate:g}',
+                     '-i', '-', '-pix_fmt', 'yuv420p', self.path],
+                    stdin=subprocess.PIPE)
+            self.process.stdin.write(np.ascontiguousarray(pixels[:, :, :3]).tobytes())
+        else:
+            o3d.io.write_image(os.path.join(self.path, f'{self.frame_count:06d}.png'), image)
+        self.frame_count += 1
+
+    def close(self):
+        if (self.process is not None):
+            self.process.stdin.close()
+            if (self.process.wait() != 0):
+                raise RuntimeError(f"ffmpeg failed to write {self.path}")
+            self.process = None
+
+class MotionVideoExporter(MotionRenderer):
+    """
+    Renders clips without a window into video files or PNG sequences.
+
+    Uses Open3D's OffscreenRenderer, which needs EGL (or OSMesa) on machines without a display.
+    """
+    def __init__(self, width=1024, height=768, model_folder='./dataset/models_lockedhead/',
+                 mesh_state=MeshState.Trasparent, draw_velocity=False, draw_acceleration=False):
+        self.renderer = rendering.OffscreenRenderer(width, height)
+        MotionRenderer.__init__(self, model_folder=model_folder)
+        self.open3d_scene = self.renderer.scene
+        self.setup_lighting()
+        self.renderer.setup_camera(45.0, [0, 0, 0], [-2, -5, 1], [0, 0, 1])
+        self.mesh_state = mesh_state
+        self.arrow_velocity.is_checked = draw_velocity
+        self.arrow_acceleration.is_checked = draw_acceleration
+
+    def export(self, motion, output, fps=None):
+        """
+        Renders every frame of a clip, or every n-th frame if 'fps' is lower than the clip frame rate.
 
-            self.current_frame = self.current_frame + 1 if self.animated_state == AnimationState.PLAYING else self.current_frame - 1
-            tick_return = gui.Application.instance.run_one_tick()
-            if tick_return:
-                self.window.post_redraw()
-            self.play_slider.int_value = self.current_frame
-                
-            if (self.animated_state == AnimationState.PAUSED):
-                running = False
-            if (self.animated_state == AnimationState.PLAYING
-                and self.current_frame >= (self.motion_data.num_frames - 1)): 
-                running = False
-                self.animated_state = AnimationState.PAUSED
-            if (self.animated_state == AnimationState.REVERSE and self.current_frame < 1):
-                running = False
-                self.animated_state = AnimationState.PAUSED
+        Args:
+        - motion (AMASS_Motion): The clip.
+        - output (str): A video file ('.mp4', '.mkv', '.avi', '.mov') or a folder for PNG files.
+        - fps (float): Frame rate of the output. Defaults to the clip frame rate.
+
+        Returns:
+        - The number of frames written.
+        """
+        self.motion_data = motion
+        self.load_poses()
+        self.open3d_scene.clear_geometry()
+        frame_step = max(1, round(motion.frame_rate / fps)) if fps else 1
+        with FrameWriter(output, motion.frame_rate / frame_step) as writer:
+            for frame in range(0, self.poses.ready_frames - 1, frame_step):
+                self.draw_frame(frame)
+                writer.write(self.renderer.render_to_image())
+        motion.unload()
+        return writer.frame_count
+
+motion_video_exporter = None
+
+def initialize_export_worker(exporter_options, num_threads):
+    global motion_video_exporter
+    torch.set_num_threads(num_threads)
+    motion_video_exporter = MotionVideoExporter(**exporter_options)
+
+def export_motion(motion, output, fps):
+    return motion_video_exporter.export(motion, output, fps)
+
+def export_motions(motions, output_folder, output_format='mp4', fps=None, workers=1, **exporter_options):
+    """
+    Exports clips in parallel, one offscreen renderer and SMPL-X model per worker process.
+
+    Args:
+    - motions (list): AMASS_Motion clips to export.
+    - output_folder (str): Folder the videos (or PNG folders) are written to, named after the clip files.
+    - output_format (str): 'mp4', 'mkv', 'avi', 'mov' or 'png'.
+    - fps (float): Frame rate of the output. Defaults to the frame rate of each clip.
+    - workers (int): Number of worker processes.
+    - exporter_options: Keyword arguments of 'MotionVideoExporter'.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    num_threads = max(1, (os.cpu_count() or 1) // workers)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=initialize_export_worker,
+                             initargs=(exporter_options, num_threads)) as executor:
+        futures = {}
+        for motion in motions:
+            name = motion_file_name(motion)
+            output = os.path.join(output_folder, name if output_format == 'png' else f'{name}.{output_format}')
+            futures[executor.submit(export_motion, motion, output, fps)] = output
+        for future in as_completed(futures):
+            print(f"{futures[future]}: {future.result()} frames")
+
+class MotionAnalyzer:
+    """
+    Computes the joint angles and the joint velocities and accelerations of clips without the GUI.
+
+    Results are the same as those of the viewer's plots and arrows, and are written to one
+    npz file per clip with one array per quantity. Only the joints are needed, so poses are
+    read from the pose cache when present but clips missing from it are not added.
+    """
+    def __init__(self, model_folder='./dataset/models_lockedhead/', vel_smoothing_size=1, acc_smoothing_size=1,
+                 normalization_setting=normalization_settings[0]):
+        self.pose_extractor = PoseExtractor(model_folder, batch_size=256)
+        self.pose_cache = PoseCache('./cache/poses/')
+        self.vel_smoothing_size = vel_smoothing_size
+        self.acc_smoothing_size = acc_smoothing_size
+        self.normalization_setting = normalization_setting
+
+    def analyze(self, motion):
+        """
+        Args:
+        - motion (AMASS_Motion): The clip.
+
+        Returns:
+        - A dict of arrays. Joint angle arrays are shaped (22, num_frames),
+          joint vector fields (num_frames, 24, 3) and their magnitudes (num_frames, 24).
+        """
+        cache_key = self.pose_cache.key(motion.path, self.pose_extractor)
+        cached_poses = self.pose_cache.load(cache_key)
+        if (cached_poses is None):
+            joint_positions, _ = self.pose_extractor.extract(motion.dataset)
+        else:
+            joint_positions = cached_poses[0]
+        joint_positions = np.asarray(joint_positions, dtype=np.float32)
+        frame_rate = float(motion.frame_rate)
+        joint_angle_data = JointAngleManager.calculate_joint_angle_data(joint_positions, frame_rate)
+        velocity_field = MotionKinematics.velocity_field(joint_positions, frame_rate, self.vel_smoothing_size)
+        acceleration_field = MotionKinematics.acceleration_field(joint_positions, frame_rate, self.acc_smoothing_size)
+
+        stats = self.pose_cache.load_stats(cache_key)
+        stats_key = self.normalization_setting.key()
+        if (stats_key not in stats):
+            max_vel, max_acc = MotionKinematics.magnitude_maxima(joint_positions, frame_rate, self.normalization_setting)
+            stats[stats_key] = {'max_vel': np.asarray(max_vel).tolist(), 'max_acc': np.asarray(max_acc).tolist()}
+            self.pose_cache.store_stats(cache_key, stats)
+        motion.unload()
+        return {
+            'frame_rate': np.float64(frame_rate),
+            'joint_positions': joint_positions,
+            'joint_angles': joint_angle_data.angles,
+            'joint_angle_velocities': joint_angle_data.velocities,
+            'joint_angle_accelerations': joint_angle_data.accelertions,
+            'velocities': velocity_field,
+            'velocity_magnitudes': np.linalg.norm(velocity_field, axis=2),
+            'accelerations': acceleration_field,
+            'acceleration_magnitudes': np.linalg.norm(acceleration_field, axis=2),
+            'max_vel': np.asarray(stats[stats_key]['max_vel']),
+            'max_acc': np.asarray(stats[stats_key]['max_acc'])
+        }
+
+    def write(self, motion, output, compress=False):
+        """
+        Writes the results of 'analyze()' to an npz file.
 
-        # print ("vel_max: ", self.vel_max)
-        # print ("acc_max: ", self.acc_max)
+        Returns:
+        - The number of frames of the clip.
+        """
+        results = self.analyze(motion)
+        tmp_output = output + '.tmp.npz'
+        (np.savez_compressed if compress else np.savez)(tmp_output, **results)
+        os.replace(tmp_output, output)
+        return results['joint_positions'].shape[0]
+
+motion_analyzer = None
+
+def initialize_analysis_worker(analyzer_options, num_threads):
+    global motion_analyzer
+    torch.set_num_threads(num_threads)
+    motion_analyzer = MotionAnalyzer(**analyzer_options)
+
+def analyze_motion(motion, output, compress):
+    return motion_analyzer.write(motion, output, compress)
+
+def analyze_motions(motions, output_folder, workers=1, compress=False, **analyzer_options):
+    """
+    Analyzes clips in parallel, one SMPL-X model per worker process.
+
+    Args:
+    - motions (list): AMASS_Motion clips to analyze.
+    - output_folder (str): Folder the npz files are written to, named after the clip files.
+    - workers (int): Number of worker processes.
+    - compress (bool): Whether to compress the npz files.
+    - analyzer_options: Keyword arguments of 'MotionAnalyzer'.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    num_threads = max(1, (os.cpu_count() or 1) // workers)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=initialize_analysis_worker,
+                             initargs=(analyzer_options, num_threads)) as executor:
+        futures = {}
+        for motion in motions:
+            output = os.path.join(output_folder, f'{motion_file_name(motion)}.npz')
+            futures[executor.submit(analyze_motion, motion, output, compress)] = output
+        for future in as_completed(futures):
+            print(f"{futures[future]}: {future.result()} frames")
+
+def motion_file_name(motion):
+    return os.path.basename(motion.path).replace('.npz', '')
+
+def resolve_motions(paths, motion_catalog):
+    """
+    Turns command line clip arguments into AMASS_Motion clips.
+
+    Args:
+    - paths (list): npz files and dataset folders. All clips of 'motion_catalog' if empty.
+    - motion_catalog (MotionCatalog): Catalog of the default dataset folder.
+    """
+    if (not paths):
+        return list(motion_catalog.registry(motion_names))
+    motions = []
+    for path in paths:
+        if (os.path.isdir(path)):
+            motions.extend(MotionCatalog(path).scan().registry(motion_names))
+        else:
+            motions.append(AMASS_Motion(motion_names.get(os.path.basename(path), os.path.basename(path)), path))
+    return motions
 
 def main():
+    parser = argparse.ArgumentParser(description="Human motion visualizer for AMASS clips.")
+    parser.add_argument('--dataset-folder', default='./dataset/',
+                        help="folder that is scanned for *_stageii.npz clips")
+    parser.add_argument('--profile', default=None, metavar='PATH',
+                        help="enable profiling from the start and write the timers to PATH on exit")
+    parser.add_argument('--memo-size', type=int, default=256,
+                        help="memory budget in MB for joint angles and fields of recently viewed clips")
+    subparsers = parser.add_subparsers(dest='command')
+    export_parser = subparsers.add_parser('export', help="render clips offscreen to video files or PNG sequences")
+    export_parser.add_argument('clips', nargs='*',
+                               help="clip files or folders to export; all clips of the dataset folder if omitted")
+    export_parser.add_argument('--output', default='./export/')
+    export_parser.add_argument('--format', default='mp4', choices=['mp4', 'mkv', 'avi', 'mov', 'png'])
+    export_parser.add_argument('--fps', type=float, default=None, help="output frame rate; the clip frame rate if omitted")
+    export_parser.add_argument('--workers', type=int, default=1, help="number of parallel worker processes")
+    export_parser.add_argument('--width', type=int, default=1024)
+    export_parser.add_argument('--height', type=int, default=768)
+    export_parser.add_argument('--mesh', default='transparent', choices=['transparent', 'opaque', 'hidden'])
+    export_parser.add_argument('--velocity', action='store_true', help="draw velocity arrows")
+    export_parser.add_argument('--acceleration', action='store_true', help="draw acceleration arrows")
+    stream_parser = subparsers.add_parser('stream', help="play an npz file, a folder of npy files or a 'host:port' feed with bounded memory")
+    stream_parser.add_argument('source')
+    stream_parser.add_argument('--capacity', type=int, default=256, help="number of skinned frames kept in memory")
+    stream_parser.add_argument('--frame-rate', type=float, default=None, help="frame rate of a folder of npy files")
+    serve_parser = subparsers.add_parser('serve', help="send a clip over TCP at its frame rate, as a stand-in for a live feed")
+    serve_parser.add_argument('clip')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=9999)
+    analyze_parser = subparsers.add_parser('analyze', help="write joint angles, velocities and accelerations of clips to npz files")
+    analyze_parser.add_argument('clips', nargs='*',
+                                help="clip files or folders to analyze; all clips of the dataset folder if omitted")
+    analyze_parser.add_argument('--output', default='./analytics/')
+    analyze_parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="number of parallel worker processes")
+    analyze_parser.add_argument('--velocity-smoothing', type=int, default=1, help="velocity smoothing window in frames")
+    analyze_parser.add_argument('--acceleration-smoothing', type=int, default=1, help="acceleration smoothing window in frames")
+    analyze_parser.add_argument('--normalization', type=int, default=0, choices=range(len(normalization_settings)),
+                                help="index of the magnitude normalization: " +
+                                ", ".join(f"{i}: {setting.name}" for i, setting in enumerate(normalization_settings)))
+    analyze_parser.add_argument('--compress', action='store_true')
+    args = parser.parse_args()
+
+    if (args.command == 'serve'):
+        serve_pose_stream(NpzPoseSource(args.clip), args.host, args.port)
+        return
+    if (args.command == 'stream'):
+        gui.Application.instance.initialize()
+        MotionStreamPlayer(open_pose_source(args.source, args.frame_rate), args.capacity)
+        gui.Application.instance.run()
+        return
+
+    motion_catalog = MotionCatalog(args.dataset_folder).scan()
+    if (args.command == 'export'):
+        selected_motions = resolve_motions(args.clips, motion_catalog)
+        mesh_states = {'transparent': MeshState.Trasparent, 'opaque': MeshState.Opaque, 'hidden': MeshState.Hidden}
+        export_motions(selected_motions, args.output, args.format, args.fps, args.workers,
+                       width=args.width, height=args.height, mesh_state=mesh_states[args.mesh],
+                       draw_velocity=args.velocity, draw_acceleration=args.acceleration)
+        return
+    if (args.command == 'analyze'):
+        analyze_motions(resolve_motions(args.clips, motion_catalog), args.output, args.workers, args.compress,
+                        vel_smoothing_size=args.velocity_smoothing, acc_smoothing_size=args.acceleration_smoothing,
+                        normalization_setting=normalization_settings[args.normalization])
+        return
 
     gui.Application.instance.initialize()
-    VisualizationApp()
+    app = VisualizationApp(motion_catalog, args.memo_size * 1024**2)
+    if (args.profile is not None):
+        app._profiler_checkbox.checked = True
+        app._on_profiler_checkbox(True)
     gui.Application.instance.run()
+    if (args.profile is not None):
+        app.save_profile(args.profile)
+        print(f"Profile written to {args.profile}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()